@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import threading
+import contextlib
+import io
+import torch
+from tdg_controller import GameController
+from qnet_inference import InferenceEngine, load_qnetwork
+from policy_backends import TRAIN_DIR
+
+MODEL_PATH = os.path.join(TRAIN_DIR, 'dqn_tower_defense_model.tdp')
+
+
+def make_games(count, engine):
+    with contextlib.redirect_stdout(io.StringIO()):
+        games = [GameController(algo='dqn', engine=engine) for _ in range(count)]
+    for seed, game in enumerate(games):
+        game.env.reset(seed=seed)
+    return games
+
+
+def advance(game, action=None):
+    """Applies action, then plays out any wave it started and restarts a finished game."""
+    env = game.env
+    if action is not None:
+        env.step(action)
+    while env.game_started:
+        env.spawn_enemies()
+    if env.is_terminal() != 'game_running':
+        env.reset()
+
+
+def eager_actions(games, model, frames):
+    """The old dqn_step: one autograd forward pass per action."""
+    for _ in range(frames):
+        for game in games:
+            obs = torch.tensor(game.dqn_state(), dtype=torch.float32)
+            advance(game, torch.argmax(model(obs.unsqueeze(0))).item())
+
+
+def engine_actions(games, engine, frames):
+    """Every game's observation goes into one forward pass per frame."""
+    for _ in range(frames):
+        futures = [game.submit_dqn_step() for game in games]
+        engine.flush()
+        for game, future in zip(games, futures):
+            advance(game, future.result())
+
+
+def threaded_actions(games, engine, frames):
+    """One thread per game calling dqn_step(); the engine's thread batches whatever is waiting."""
+    def play(game):
+        for _ in range(frames):
+            advance(game, game.dqn_step())
+    threads = [threading.Thread(target=play, args=(game,)) for game in games]
+    engine.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.stop()
+
+
+def report(name, actions, seconds, engine=None):
+    line = f"{name:>24}: {actions / seconds:>9,.0f} actions/sec"
+    if engine is not None:
+        stats = engine.stats()
+        line += (f", mean batch {stats['mean_batch']:.1f}, "
+                 f"p50 {stats['p50_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms")
+    print(line)
+
+
+if __name__ == '__main__':
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    game_counts = [int(n) for n in sys.argv[2:]] or [1, 16, 64]
+    torch.set_num_threads(1)
+
+    for count in game_counts:
+        print(f"{count} games x {frames} actions")
+        model = load_qnetwork(MODEL_PATH)
+        games = make_games(count, InferenceEngine(model))
+        start = time.perf_counter()
+        eager_actions(games, model, frames)
+        report('eager, one at a time', count * frames, time.perf_counter() - start)
+
+        for name, run, compile in (('engine, batched', engine_actions, False),
+                                   ('engine, batched, traced', engine_actions, True),
+                                   ('engine, threads, traced', threaded_actions, True)):
+            engine = InferenceEngine(model, max_batch=max(count, 1), compile=compile)
+            games = make_games(count, engine)
+            start = time.perf_counter()
+            run(games, engine, frames)
+            report(name, count * frames, time.perf_counter() - start, engine)
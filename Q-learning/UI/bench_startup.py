@@ -0,0 +1,52 @@
+import sys
+import os
+import json
+import time
+import subprocess
+import statistics
+from policy_backends import POLICY_BACKENDS
+
+UI_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Run in a fresh interpreter per sample, so every import is a cold one (the OS page cache stays warm).
+CHILD = '''
+import sys, time, json, contextlib, io, resource
+start = time.perf_counter()
+from tdg_controller import GameController
+imported = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    game = GameController(algo=sys.argv[1])
+built = time.perf_counter()
+game.q_learning_step()
+acted = time.perf_counter()
+print(json.dumps({
+    'import_ms': 1000 * (imported - start),
+    'construct_ms': 1000 * (built - imported),
+    'first_action_ms': 1000 * (acted - built),
+    'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'torch_loaded': 'torch' in sys.modules,
+}))
+'''
+
+
+def cold_start(algo):
+    """One fresh process building GameController(algo) and taking one action; wall_ms includes interpreter start-up."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-W', 'ignore', '-c', CHILD, algo], cwd=UI_DIR,
+                            capture_output=True, text=True, check=True)
+    sample = json.loads(result.stdout.splitlines()[-1])
+    sample['wall_ms'] = 1000 * (time.perf_counter() - start)
+    return sample
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    algos = sys.argv[2:] or sorted(POLICY_BACKENDS)
+    for algo in algos:
+        samples = [cold_start(algo) for _ in range(repeats)]
+        median = {key: statistics.median(sample[key] for sample in samples)
+                  for key in ('wall_ms', 'import_ms', 'construct_ms', 'first_action_ms', 'peak_rss_mib')}
+        print(f"{algo:>10}: {median['wall_ms']:7.0f} ms to first action "
+              f"(import {median['import_ms']:.0f} ms, construct {median['construct_ms']:.0f} ms, "
+              f"first action {median['first_action_ms']:.1f} ms), peak RSS {median['peak_rss_mib']:.0f} MiB, "
+              f"torch {'loaded' if samples[0]['torch_loaded'] else 'not loaded'}")
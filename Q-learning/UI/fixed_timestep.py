@@ -0,0 +1,33 @@
+class FixedTimestep:
+    """
+    Accumulates real frame time, scaled by speed, and hands it out as fixed
+    simulation steps of step_ms, so game logic advances the same way whatever
+    the frame rate. A frame longer than max_frame_ms only counts as
+    max_frame_ms: after a stall, or when the steps of one frame cost more than
+    the frame, the simulation falls behind real time instead of skipping steps.
+    """
+
+    min_speed, max_speed = 1, 1000
+
+    def __init__(self, step_ms, speed=1, max_frame_ms=250):
+        self.step_ms = step_ms
+        self.max_frame_ms = max_frame_ms
+        self.accumulator = 0.0
+        self.sim_time = 0.0  # ms of simulated time
+        self.set_speed(speed)
+
+    def set_speed(self, speed):
+        self.speed = min(max(speed, self.min_speed), self.max_speed)
+
+    def steps(self, frame_ms):
+        """Adds one frame of real time and yields the simulated time of every whole step it covers."""
+        self.accumulator += min(frame_ms, self.max_frame_ms) * self.speed
+        while self.accumulator >= self.step_ms:
+            self.accumulator -= self.step_ms
+            self.sim_time += self.step_ms
+            yield self.sim_time
+
+    @property
+    def alpha(self):
+        """How far between the last step and the next one the frame being drawn is, in [0, 1)."""
+        return self.accumulator / self.step_ms
@@ -0,0 +1,84 @@
+import struct
+import zlib
+import numpy as np
+
+# A frame stream file is a header followed by one record per frame: the frame's RGB bytes
+# XORed with the previous frame's, zlib-compressed, prefixed with the compressed length.
+# Pixels that did not change XOR to zero, so a frame costs roughly what changed in it.
+MAGIC = b'TDFS'
+header = struct.Struct('<4sHHf')  # magic, width, height, ms per frame
+record_size = struct.Struct('<I')
+
+
+class FrameStreamWriter:
+    def __init__(self, path, size, frame_ms, level=1):
+        # Level 1: the deltas are mostly zeros; higher levels roughly halve the size at several times the cost.
+        self.width, self.height = size
+        self.level = level
+        self.frames = 0
+        self.previous = np.zeros(self.width * self.height * 3, np.uint8)
+        self.file = open(path, 'wb')
+        self.file.write(header.pack(MAGIC, self.width, self.height, frame_ms))
+
+    def write(self, rgb):
+        """Appends one frame of width * height * 3 RGB bytes."""
+        frame = np.frombuffer(rgb, np.uint8)
+        data = zlib.compress((frame ^ self.previous).tobytes(), self.level)
+        self.file.write(record_size.pack(len(data)))
+        self.file.write(data)
+        self.previous = frame
+        self.frames += 1
+
+    def close(self):
+        self.file.close()
+
+
+class GifWriter:
+    """Collects frames and saves them as a looping animated GIF on close(); needs Pillow."""
+
+    def __init__(self, path, size, frame_ms):
+        try:
+            from PIL import Image
+        except ImportError:
+            raise ImportError("Writing .gif files needs Pillow (pip install Pillow); "
+                              "any other extension writes a frame stream instead")
+        self.image = Image
+        self.path = path
+        self.size = size
+        self.frame_ms = frame_ms
+        self.images = []
+        self.frames = 0
+
+    def write(self, rgb):
+        # Quantizing as frames arrive keeps one palette image per frame in memory, not RGB.
+        self.images.append(self.image.frombytes('RGB', self.size, rgb).quantize())
+        self.frames += 1
+
+    def close(self):
+        # GIF frame delays are whole hundredths of a second, 20 ms at the least.
+        duration = max(20, round(self.frame_ms / 10) * 10)
+        self.images[0].save(self.path, save_all=True, append_images=self.images[1:],
+                            duration=duration, loop=0)
+
+
+def open_writer(path, size, frame_ms):
+    """A GifWriter for .gif paths, otherwise a FrameStreamWriter."""
+    if path.lower().endswith('.gif'):
+        return GifWriter(path, size, frame_ms)
+    return FrameStreamWriter(path, size, frame_ms)
+
+
+def read_frames(path):
+    """Yields the frames of a frame stream as (height, width, 3) uint8 arrays."""
+    with open(path, 'rb') as f:
+        magic, width, height, frame_ms = header.unpack(f.read(header.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a frame stream")
+        frame = np.zeros(width * height * 3, np.uint8)
+        while True:
+            prefix = f.read(record_size.size)
+            if not prefix:
+                return
+            (length,) = record_size.unpack(prefix)
+            frame = frame ^ np.frombuffer(zlib.decompress(f.read(length)), np.uint8)
+            yield frame.reshape(height, width, 3)
@@ -0,0 +1,93 @@
+import os
+import pickle
+import numpy as np
+
+TRAIN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'train')
+
+# GameController(algo=name) acts through POLICY_BACKENDS[name]. A backend imports what it
+# needs in __init__, so a controller only pays for its own algorithm's dependencies
+# (torch costs seconds and hundreds of MB, and the Q-table backends never touch it).
+POLICY_BACKENDS = {}
+
+
+def register_backend(name):
+    """Class decorator adding a backend: cls(controller, **options), with act() returning the next action."""
+    def register(cls):
+        POLICY_BACKENDS[name] = cls
+        return cls
+    return register
+
+
+def make_backend(name, controller, **options):
+    if name not in POLICY_BACKENDS:
+        raise ValueError(f"Unknown algo {name!r}; registered backends are {sorted(POLICY_BACKENDS)}")
+    return POLICY_BACKENDS[name](controller, **options)
+
+
+@register_backend('ql')
+class QTableBackend:
+    """
+    The tabular Q-learning agent; needs only NumPy. path is a policy artifact,
+    or an older .npy / dict-of-arrays .pickle Q-table indexed by controller.hash().
+    """
+
+    def __init__(self, controller, path=os.path.join(TRAIN_DIR, 'Q_table_winning_train_a_lot.tdp')):
+        self.controller = controller
+        self.state_index = controller.hash
+        try:
+            self.q_table = self.load_q_table(path)
+            print("Loaded trained Q table successfully!")
+        except Exception as e:
+            print("Failed to load Q table, initializing a new one.", e)
+            self.q_table = np.zeros((controller.num_states, controller.num_actions))
+
+    def load_q_table(self, path):
+        """Artifacts and .npy tables are memory-mapped, shared between every process using them."""
+        if path.endswith('.tdp'):
+            from tdg_env.policy_artifact import DQL_HASH, load_artifact
+            artifact = load_artifact(path, 'q_table')
+            artifact.check_env(self.controller.env)
+            if artifact.state_hash != DQL_HASH:  # controller.hash() is DQL_HASH, without the generic lookup
+                self.state_index = artifact.state_index
+            return artifact.arrays['q_values']
+        if path.endswith('.npy'):
+            return np.load(path, mmap_mode='r')
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def act(self):
+        return self.q_table[self.state_index(self.controller.env.get_observation())].argmax()
+
+
+@register_backend('dqn')
+class DQNBackend:
+    """
+    The DQN through an InferenceEngine; imports torch. Pass engine to share one
+    engine (and its batches) between controllers.
+    """
+
+    def __init__(self, controller, engine=None, path=os.path.join(TRAIN_DIR, 'dqn_tower_defense_model.tdp')):
+        from qnet_inference import InferenceEngine, load_qnetwork
+        self.controller = controller
+        if engine is None:
+            engine = InferenceEngine(load_qnetwork(path, 3, controller.env.action_space.n))
+        self.engine = engine
+
+    def act(self):
+        return self.engine.act(self.controller.dqn_state())
+
+    def submit(self):
+        return self.engine.submit(self.controller.dqn_state())
+
+
+@register_backend('dqn_table')
+class PolicyTableBackend:
+    """The DQN's greedy actions, tabulated by dqn_test.distill_model(); needs only NumPy."""
+
+    def __init__(self, controller, path=os.path.join(TRAIN_DIR, 'dqn_policy_table.tdp')):
+        from tdg_env.policy_table import PolicyTable
+        self.controller = controller
+        self.policy_table = PolicyTable.load(path)
+
+    def act(self):
+        return self.policy_table.act(self.controller.env.get_observation())
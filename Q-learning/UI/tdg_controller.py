@@ -1,34 +1,27 @@
-from test_gym_new import TowerDefenseEnv
-import numpy as np
+import os
+import sys
+import time
 import random
-import pickle
-import torch
-from QNetwork import QNetwork
+from policy_backends import make_backend
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tdg_env import TowerDefenseEnv
 
 class GameController:
-    def __init__(self, algo='ql'):
+    def __init__(self, algo='ql', **backend_options):
+        """
+        algo names a policy backend in policy_backends.POLICY_BACKENDS ('ql',
+        'dqn', 'dqn_table'); backend_options go to it, e.g. engine= to share an
+        InferenceEngine between 'dqn' controllers.
+        """
         self.algo_used = algo
-        self.env = TowerDefenseEnv()
-
-        if algo == 'dqn':
-            action_space = self.env.action_space.n
-            model = QNetwork(3, action_space)
-            model.load_state_dict(torch.load('../train/dqn_tower_defense_model.pth'))
-            self.dqn_model = model
-        
+        self.env = TowerDefenseEnv(wave_mode='ticked')  # The views tick waves with spawn_enemies()
         self.current_observation, _, _, _ = self.env.reset()
 
         # Q-Learning setup
         self.num_states = 1000  # Simplified state count
         self.num_actions = self.env.rows * self.env.cols  # One action per grid cell (tower placement)
-        if algo == 'ql':
-            try:
-                with open('../train/Q_table_winning_train_a_lot.pickle', 'rb') as f:
-                    self.q_table = pickle.load(f)
-                print("Loaded trained Q table successfully!")
-            except Exception as e:
-                print("Failed to load Q table, initializing a new one.", e)
-                self.q_table = np.zeros((self.num_states, self.num_actions))
+        self.policy = make_backend(algo, self, **backend_options)
         self.alpha = 0.1
         self.gamma = 0.95
         self.epsilon = 0
@@ -39,11 +32,11 @@ class GameController:
         state = min(enemies_count * 10 + self.env.current_wave, self.num_states - 1)
         return state
 
-    def choose_action(self, state):
-        """Epsilon-greedy action selection"""
+    def choose_action(self, state=None):
+        """Epsilon-greedy action selection; the greedy action is the policy backend's, read from the env (state is unused)"""
         if random.random() < self.epsilon:
             return random.randint(0, self.num_actions - 1)
-        return np.argmax(self.q_table[state])
+        return self.policy.act()
 
     def perform_action(self, action):
         row = action // self.env.cols
@@ -59,21 +52,18 @@ class GameController:
         return x * (7 * 3) + y * 3 + h
 
     def q_learning_step(self):
-        if self.algo_used == 'dqn':
-            return self.dqn_step()
+        return self.policy.act()
+    
+    def dqn_state(self):
         obs = self.env.get_observation()
-        state = self.hash(obs)
-        action = np.argmax(self.q_table[state])
+        return [obs['current_position'][0], obs['current_position'][1], obs['current_selected_tower']]
 
-        return action
-    
     def dqn_step(self):
-        obs = self.env.get_observation()
-        state = np.array([obs['current_position'][0], obs['current_position'][1], obs['current_selected_tower']])
-        state = torch.tensor(state, dtype=torch.float32)
-        q_values = self.dqn_model(state.unsqueeze(0))
-        action = torch.argmax(q_values).item()
-        return action
+        return self.policy.act()
+
+    def submit_dqn_step(self):
+        """Queues this game's observation on the shared engine; the Future holds the action once it is flushed."""
+        return self.policy.submit()
 
     def reset(self):
         self.current_observation, _, _, _ = self.env.reset()
@@ -83,23 +73,59 @@ class GameController:
         self.env.spawn_enemies()
 
     def get_game_data(self):
+        env = self.env  # Read every frame by the views
         return {
-            "towers": self.env.towers,
-            "enemies": self.env.enemies,
-            "player_pos": self.env.player_pos,
-            "selected_tower": self.env.selected_tower,
-            "current_wave": self.env.current_wave,
-            "coins": self.env.coins,
-            "available_towers": self.env.available_towers,
-            "game_over": self.env.game_over,
-            "game_started": self.env.game_started,
-            "start_time": getattr(self.env, "start_time", None),
-            "rows": self.env.rows,
-            "cols": self.env.cols,
-            "path_row": self.env.path_row,
-            "tower_info": self.env.tower_info,
-            "enemy_info": self.env.enemy_info,
+            "towers": env.towers,
+            "enemies": env.enemies,
+            "player_pos": env.player_pos,
+            "selected_tower": env.selected_tower,
+            "current_wave": env.current_wave,
+            "coins": env.coins,
+            "available_towers": env.available_towers,
+            "game_over": env.game_over,
+            "game_started": env.game_started,
+            "start_time": env.start_time,
+            "rows": env.rows,
+            "cols": env.cols,
+            "path_row": env.path_row,
+            "tower_info": env.tower_info,
+            "enemy_info": env.enemy_info,
         }
 
+    def game_data_changes(self, since=-1, copy=False):
+        """
+        Versioned get_game_data(): returns (generation, changes), where changes
+        holds only the entries the env touched after generation since (every
+        entry for -1). Keep one dict, update() it with changes and pass the
+        returned generation next time. Like get_game_data(), towers and
+        available_towers are the env's own objects unless copy=True, for
+        consumers that keep old snapshots around or send them elsewhere.
+        """
+        env = self.env
+        generation, fields = env.changes_since(since)
+        if since < 0:
+            changes = self.get_game_data()
+        else:
+            changes = {field: getattr(env, field) for field in fields}
+        if copy:
+            if 'towers' in changes:
+                changes['towers'] = {pos: dict(tower) for pos, tower in changes['towers'].items()}
+            if 'available_towers' in changes:
+                changes['available_towers'] = list(changes['available_towers'])
+        return generation, changes
+
+    def select_tower(self, tower):
+        """Selects tower for the next placement if it is unlocked; returns whether it was."""
+        if tower not in self.env.available_towers:
+            return False
+        self.env.selected_tower = tower
+        self.env.touch('selected_tower')
+        return True
+
+    def start_timer(self):
+        """Starts the wave timer the views show."""
+        self.env.start_time = time.time()
+        self.env.touch('start_time')
+
     def close(self):
         self.env.close()
@@ -1,12 +1,14 @@
 import pygame
 import time
+import text_cache
 from tdg_controller import GameController
 
 # game = GameController('dqn')
 game = GameController()
 observation = game.reset()
 
-data = game.get_game_data()
+# data is kept in step with the game by sync_data(), which only fetches what changed.
+generation, data = game.game_data_changes()
 rows, cols = data["rows"], data["cols"]
 path_row = data["path_row"]
 
@@ -55,10 +57,14 @@ def draw_health_bar(x, y, current_health, max_health, width, height):
     health_ratio = current_health / max_health if max_health > 0 else 0
     pygame.draw.rect(screen, (0, 255, 0), (x, y, int(width * health_ratio), height))
 
+def sync_data():
+    """Brings data up to date with the game; returns the entries that changed."""
+    global generation
+    generation, changes = game.game_data_changes(generation)
+    data.update(changes)
+    return changes
+
 def draw_grid():
-    
-    font = pygame.font.SysFont(None, 24)
-    data = game.get_game_data()
     towers = data["towers"]
     enemies = data["enemies"]
     player_pos = data["player_pos"]
@@ -92,7 +98,6 @@ def draw_grid():
                 draw_health_bar(col * cell_size, bar_y, current_health, max_health, cell_size, 5)
             
     # Draw enemies.
-    font_small = pygame.font.SysFont(None, 20)
     for enemy in enemies:
         enemy_x = enemy.get('x', cols - 1)
         enemy_y = path_row
@@ -114,15 +119,12 @@ def draw_grid():
                      (player_pos[1] * cell_size, player_pos[0] * cell_size, cell_size, cell_size), 3)
 
 def draw_ui():
-    font = pygame.font.SysFont(None, 24)
-    data = game.get_game_data()
-    
     # Check win condition
     if data["game_over"] or data["current_wave"] >  game.env.max_waves:
         win_text = "GAME WON" if data["current_wave"] > game.env.max_waves else "GAME OVER"
-        screen.blit(font.render(win_text, True, (255, 0, 0)), (10, rows * cell_size + 10))
-        screen.blit(font.render(f"Final Wave: {data['current_wave']}", True, BLACK), (10, rows * cell_size + 40))
-        screen.blit(font.render(f"Final Coins: {data['coins']}", True, BLACK), (10, rows * cell_size + 70))
+        screen.blit(text_cache.render(win_text, 24, (255, 0, 0)), (10, rows * cell_size + 10))
+        screen.blit(text_cache.render(f"Final Wave: {data['current_wave']}", 24, BLACK), (10, rows * cell_size + 40))
+        screen.blit(text_cache.render(f"Final Coins: {data['coins']}", 24, BLACK), (10, rows * cell_size + 70))
         return
 
     # Normal UI display
@@ -138,34 +140,29 @@ def draw_ui():
     ui_lines.append("Locked Towers: " + ",".join(locked))
 
     for i, line in enumerate(ui_lines):
-        screen.blit(font.render(line, True, BLACK), (10, rows * cell_size + 10 + i * 20))
+        screen.blit(text_cache.render(line, 24, BLACK), (10, rows * cell_size + 10 + i * 20))
 
     if data["game_started"] and data.get("start_time"):
-        screen.blit(font.render(f"Time: {int(time.time() - data['start_time'])}", True, BLACK),
+        screen.blit(text_cache.render(f"Time: {int(time.time() - data['start_time'])}", 24, BLACK),
                     (window_width - 150, rows * cell_size + 10))
 
 def draw_game_over():
     """
     Displays a GAME OVER overlay if the game is over.
     """
-    data = game.get_game_data()
     if data["game_over"]:
-        font = pygame.font.SysFont(None, 72)
-        text = font.render("GAME OVER", True, (255, 0, 0))
+        text = text_cache.render("GAME OVER", 72, (255, 0, 0))
         text_rect = text.get_rect(center=(window_width // 2, window_height // 2))
         screen.blit(text, text_rect)
 
 def process_key(event):
-    if game.get_game_data()["game_over"]:
+    if game.env.is_terminal() != 'game_running':
         return
 
+    sync_data()
     # Numeric keys for tower selection.
     if event.type == pygame.KEYDOWN and event.unicode in '123':
-        tower_choice = int(event.unicode)
-        data = game.get_game_data()
-        if tower_choice in data["available_towers"]:
-            game.env.selected_tower = tower_choice
-        else:
+        if not game.select_tower(int(event.unicode)):
             print("Tower locked for current wave")
     elif event.type == pygame.KEYDOWN:
         action = None
@@ -178,14 +175,12 @@ def process_key(event):
         elif event.key == pygame.K_d:
             action = 'RIGHT'
         elif event.key == pygame.K_p:
-            if not game.get_game_data()["game_started"]:
+            if not data["game_started"]:
                 action = 'PLACE_TOWER'
         elif event.key == pygame.K_v:
-            if not game.get_game_data()["game_started"]:
+            if not data["game_started"]:
                 action = 'START_WAVE'
-                for idx, enemy in enumerate(game.env.enemies):
-                    enemy['x'] = cols - 1 + idx * 2
-                game.env.start_time = time.time()
+                game.start_timer()
         if action:
             print("[DEBUG] Action detected:", action)
             game.env.step(action)
@@ -194,8 +189,10 @@ def process_key(event):
 def refresh():
     screen.fill(WHITE)
     # Only spawn enemies if the wave is active
-    if game.get_game_data()["game_started"]:
+    sync_data()
+    if data["game_started"]:
         game.spawn_enemies()
+        sync_data()
     draw_grid()
     draw_ui()
     draw_game_over()
@@ -215,16 +212,16 @@ while running:
             process_key(event)  # Allow manual control only if not agent_mode
 
     # AGENT ACTION
-    if agent_mode and not game.get_game_data()["game_over"]:
+    if agent_mode and game.env.is_terminal() == 'game_running':
         agent_timer += clock.get_time()
         if agent_timer >= 1500:  # Agent acts every 1.5 seconds
             action_to_do = game.q_learning_step()
             agent_timer = 0
 
             # Debug: print towers after each action
-            print("Towers on the map:", game.get_game_data()["towers"])
+            print("Towers on the map:", game.env.towers)
 
             game.env.step(action_to_do)
 
     refresh()
-    clock.tick(5)  # Maintain 10 FPS
\ No newline at end of file
+    clock.tick(5)  # Maintain 5 FPS
@@ -1,11 +1,37 @@
-import pygame
+import os
 import sys
+import time
+import random
+import argparse
+from collections import OrderedDict
+import numpy as np
+
+parser = argparse.ArgumentParser(description='Animated Tower Defense view')
+parser.add_argument('speed', nargs='?', type=float, default=1,
+                    help='simulation speed multiplier, 1-1000')
+parser.add_argument('--record', metavar='PATH',
+                    help='play agent games headless, as fast as possible, and write them to PATH '
+                         '(.gif needs Pillow; any other extension writes a frame stream). '
+                         'PATH may contain {seed}')
+parser.add_argument('--seeds', default='0', help='seed, or first-last range of seeds, to record')
+parser.add_argument('--every', type=int, default=4, help='record every Nth simulation step')
+parser.add_argument('--max-minutes', type=float, default=30,
+                    help='simulated minutes after which an unfinished recorded game is cut off')
+args = parser.parse_args()
+if args.record:
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'  # No window; must be set before pygame.init()
+
+import pygame
+import text_cache
+import frame_stream
+from fixed_timestep import FixedTimestep
 from tdg_controller import GameController
 
 # Setup
 game = GameController(algo='ql')
 observation = game.reset()
-data = game.get_game_data()
+# data is kept in step with the game by sync_data(), which only fetches what changed.
+generation, data = game.game_data_changes()
 rows, cols = data["rows"], data["cols"]
 path_row = data["path_row"]
 cell_size = 75
@@ -40,6 +66,77 @@ for key in enemy_images:
 grass_tile = pygame.transform.scale(pygame.image.load("../images/grass.png").convert_alpha(), (cell_size, cell_size))
 path_tile = pygame.transform.scale(pygame.image.load("../images/cobblestone.png").convert_alpha(), (cell_size, cell_size))
 
+# Scaled / tinted sprite variants, keyed by (image set, image key, scale step, tint). Scales are
+# quantized to 1 / scale_steps of a cell, which is also the enemy shrink step, so the grow-in and
+# shrink animations only ever use scale_steps + 1 sizes; these are all rendered at load time.
+sprite_images = {'tower': tower_images, 'enemy': enemy_images}
+scale_steps = 20
+sprite_cache = OrderedDict()
+sprite_cache_size = 256
+sprite_cache_misses = 0
+
+def get_sprite(kind, key, step=scale_steps, tint=None):
+    global sprite_cache_misses
+    cache_key = (kind, key, step, tint)
+    sprite = sprite_cache.get(cache_key)
+    if sprite is not None:
+        sprite_cache.move_to_end(cache_key)
+        return sprite
+
+    sprite_cache_misses += 1
+    size = cell_size * step // scale_steps
+    if tint == 'flash':
+        sprite = pygame.Surface((size, size))
+        sprite.fill((255, 255, 255))
+    else:
+        sprite = sprite_images[kind][key]
+        if size != cell_size:
+            sprite = pygame.transform.scale(sprite, (size, size))
+        if tint in ('hover', 'hover_invalid'):
+            sprite = sprite.copy()
+            if tint == 'hover_invalid':
+                red_overlay = pygame.Surface((size, size), pygame.SRCALPHA)
+                red_overlay.fill((255, 0, 0, 100))
+                sprite.blit(red_overlay, (0, 0))
+            sprite.set_alpha(150)
+    sprite_cache[cache_key] = sprite
+    if len(sprite_cache) > sprite_cache_size:
+        sprite_cache.popitem(last=False)
+    return sprite
+
+def scale_step(scale):
+    return max(0, min(scale_steps, round(scale * scale_steps)))
+
+for kind, images in sprite_images.items():
+    for key in images:
+        for step in range(scale_steps + 1):
+            get_sprite(kind, key, step)
+for key in tower_images:
+    get_sprite('tower', key, tint='hover')
+    get_sprite('tower', key, tint='hover_invalid')
+get_sprite('enemy', None, tint='flash')
+load_misses = sprite_cache_misses
+
+# Histogram of refresh() times: frame_time_counts[i] counts frames under frame_time_buckets[i] ms.
+frame_time_buckets = (0.25, 0.5, 1, 2, 4, 8, 16, 33, float('inf'))
+frame_time_counts = [0] * len(frame_time_buckets)
+
+def record_frame_time(ms):
+    for i, bound in enumerate(frame_time_buckets):
+        if ms < bound:
+            frame_time_counts[i] += 1
+            return
+
+def print_frame_time_histogram():
+    frames = sum(frame_time_counts)
+    print(f"Frame times over {frames} frames "
+          f"(sprites rendered after load: {sprite_cache_misses - load_misses}):")
+    lower = 0
+    for bound, count in zip(frame_time_buckets, frame_time_counts):
+        share = count / frames if frames else 0
+        print(f"  {lower:>5} - {bound:<5} ms {count:>7} {'#' * round(40 * share)}")
+        lower = bound
+
 # State
 projectiles = []
 enemy_projectiles = []
@@ -54,16 +151,26 @@ spawn_delay = 1000
 show_cursor = True
 selected_tower = 1  # Synced tower selection
 
+# Game logic runs in fixed 60 Hz steps of simulated time, sim_speed (1-1000, first command
+# line argument) times faster than real time; frames are drawn between steps.
+sim_step_ms = 1000 / 60
+sim_speed = args.speed
+timestep = FixedTimestep(sim_step_ms, sim_speed)
+agent_delay = 1200
+last_agent_time = 0
+
 # Classes
 class EnemyProjectile:
     def __init__(self, start, tower):
         self.x, self.y = start
+        self.prev_x, self.prev_y = start
         self.tx = tower[1] * cell_size + cell_size // 2
         self.ty = tower[0] * cell_size + cell_size // 2
         self.speed = 10
         self.active = True
 
     def update(self):
+        self.prev_x, self.prev_y = self.x, self.y
         dx, dy = self.tx - self.x, self.ty - self.y
         dist = (dx**2 + dy**2)**0.5
         if dist < self.speed:
@@ -72,12 +179,10 @@ class EnemyProjectile:
         self.x += dx / dist * self.speed
         self.y += dy / dist * self.speed
 
-    def draw(self):
-        pygame.draw.circle(screen, (139, 0, 0), (int(self.x), int(self.y)), 6)
-
 class Projectile:
     def __init__(self, start, enemy):
         self.x, self.y = start
+        self.prev_x, self.prev_y = start
         self.tx = enemy['x'] * cell_size + cell_size // 2
         self.ty = path_row * cell_size + cell_size // 2
         self.target = enemy
@@ -85,6 +190,7 @@ class Projectile:
         self.active = True
 
     def update(self):
+        self.prev_x, self.prev_y = self.x, self.y
         dx, dy = self.tx - self.x, self.ty - self.y
         dist = (dx ** 2 + dy ** 2) ** 0.5
         if dist < self.speed:
@@ -94,30 +200,70 @@ class Projectile:
         self.x += dx / dist * self.speed
         self.y += dy / dist * self.speed
 
-    def draw(self):
-        pygame.draw.circle(screen, (255, 215, 0), (int(self.x), int(self.y)), 6)
-
 # Drawing
+# With dirty_rendering only the parts of the screen that changed since the last frame are
+# redrawn and pushed with display.update(); otherwise every frame is redrawn and flipped.
+dirty_rendering = True
+full_redraw = True  # First frame is always drawn in full
+grid_rect = pygame.Rect(0, 0, cols * cell_size, rows * cell_size)
+panel_rect = pygame.Rect(0, rows * cell_size, window_width, window_height - rows * cell_size)
+
+# The tiles and grid lines never change, so they are baked into one surface at startup.
+background = pygame.Surface((window_width, window_height))
+background.fill(WHITE)
+for row in range(rows):
+    for col in range(cols):
+        tile = path_tile if row == path_row else grass_tile
+        background.blit(tile, (col * cell_size, row * cell_size))
+        pygame.draw.rect(background, BLACK, (col * cell_size, row * cell_size, cell_size, cell_size), 1)
+background = background.convert()
+
+last_drawn = {}  # sprite key -> (rect, draw args) as of the previous frame
+last_ui_state = None
+
 def draw_health_bar(x, y, current_health, max_health, width, height):
     pygame.draw.rect(screen, (255, 0, 0), (x, y, width, height))
     health_ratio = current_health / max_health if max_health > 0 else 0
     pygame.draw.rect(screen, (0, 255, 0), (x, y, int(width * health_ratio), height))
 
-def draw_grid():
-    data = game.get_game_data()
+def draw_tower(x, y, tower_type, step, health, max_health):
+    img = get_sprite('tower', tower_type, step)
+    img_rect = img.get_rect(center=(x + cell_size // 2, y + cell_size // 2))
+    screen.blit(img, img_rect)
+    draw_health_bar(x, y + cell_size - 8, health, max_health, cell_size, 5)
+
+def draw_enemy(ex, ey, etype, look, step, health, max_health):
+    if look == 'shrink':
+        img = get_sprite('enemy', etype, step)
+    elif look == 'flash':
+        img = get_sprite('enemy', None, tint='flash')
+    else:
+        img = enemy_images[etype]
+    screen.blit(img, (ex, ey))
+    draw_health_bar(ex, ey + cell_size - 8, health, max_health, cell_size, 5)
+
+def draw_cursor(px, py, tower_type, valid_tile, range_radius):
+    hover_img = get_sprite('tower', tower_type, tint='hover' if valid_tile else 'hover_invalid')
+    screen.blit(hover_img, (px, py))
+    pygame.draw.rect(screen, WHITE, (px, py, cell_size, cell_size), 2)
+    pygame.draw.circle(screen, (255, 215, 0), (px + cell_size // 2, py + cell_size // 2), range_radius, 2)
+
+def draw_projectile(x, y, color):
+    pygame.draw.circle(screen, color, (x, y), 6)
+
+def grid_sprites(data, now, alpha=1.0):
+    """
+    Advances the grid animations by one frame and returns what the grid shows,
+    bottom layer first, as (key, rect, draw, args) tuples: draw(*args) paints
+    the sprite inside rect, so unchanged args mean unchanged pixels.
+    Projectiles are drawn alpha of the way from their previous simulation step
+    to their current one.
+    """
     towers = data["towers"]
-    enemies = data["enemies"]
     player_pos = data["player_pos"]
     tower_info = data["tower_info"]
     enemy_info = data["enemy_info"]
-
-    for row in range(rows):
-        for col in range(cols):
-            tile = path_tile if row == path_row else grass_tile
-            screen.blit(tile, (col * cell_size, row * cell_size))
-            pygame.draw.rect(screen, BLACK, (col * cell_size, row * cell_size, cell_size, cell_size), 1)
-
-    now = pygame.time.get_ticks()
+    sprites = []
 
     for pos, tower in towers.items():
         x, y = pos[1] * cell_size, pos[0] * cell_size
@@ -125,77 +271,110 @@ def draw_grid():
         spawn_time = tower_spawn_time.get(pos, now)
         tower_spawn_time[pos] = spawn_time
         scale = min(1.0, (now - spawn_time) / 300)
-        img = pygame.transform.scale(tower_images[tower_type], (int(cell_size * scale), int(cell_size * scale)))
-        img_rect = img.get_rect(center=(x + cell_size // 2, y + cell_size // 2))
-        screen.blit(img, img_rect)
-        draw_health_bar(x, y + cell_size - 8, tower['health'], tower_info[tower_type]['health'], cell_size, 5)
+        sprites.append((('tower', pos), pygame.Rect(x, y, cell_size, cell_size), draw_tower,
+                        (x, y, tower_type, scale_step(scale), tower['health'], tower_info[tower_type]['health'])))
 
-    for enemy in enemies:
+    for enemy in data["enemies"]:
         ex = enemy['x'] * cell_size
         ey = path_row * cell_size
         etype = enemy['type']
         health = enemy['health']
-        max_health = enemy_info[etype]['health']
         key = (ex, etype)
+        look, step = 'normal', scale_steps
         if health <= 0:
             enemy_shrink[key] = enemy_shrink.get(key, 1.0) - 0.05
-            scale = max(enemy_shrink[key], 0.1)
-            img = pygame.transform.scale(enemy_images[etype], (int(cell_size * scale), int(cell_size * scale)))
+            look, step = 'shrink', scale_step(max(enemy_shrink[key], 0.1))
         elif key in enemy_flash:
-            img = pygame.Surface((cell_size, cell_size))
-            img.fill((255, 255, 255))
+            look = 'flash'
             enemy_flash[key] -= 1
             if enemy_flash[key] <= 0:
                 del enemy_flash[key]
-        else:
-            img = enemy_images[etype]
-        screen.blit(img, (ex, ey))
-        draw_health_bar(ex, ey + cell_size - 8, health, max_health, cell_size, 5)
+        sprites.append((('enemy', ex), pygame.Rect(ex, ey, cell_size, cell_size), draw_enemy,
+                        (ex, ey, etype, look, step, health, enemy_info[etype]['health'])))
 
-    # Draw cursor
     if show_cursor:
-        pos = tuple(player_pos)
-        valid_tile = pos not in towers and player_pos[0] != path_row
-        hover_img = tower_images[selected_tower].copy()
-        hover_img.set_alpha(150)
-        if not valid_tile:
-            red_overlay = pygame.Surface((cell_size, cell_size), pygame.SRCALPHA)
-            red_overlay.fill((255, 0, 0, 100))
-            hover_img.blit(red_overlay, (0, 0))
-        screen.blit(hover_img, (player_pos[1] * cell_size, player_pos[0] * cell_size))
-        pygame.draw.rect(screen, WHITE, (player_pos[1] * cell_size, player_pos[0] * cell_size, cell_size, cell_size), 2)
+        px, py = player_pos[1] * cell_size, player_pos[0] * cell_size
+        valid_tile = tuple(player_pos) not in towers and player_pos[0] != path_row
         range_radius = tower_info[selected_tower]['range'] * cell_size
-        center_x = player_pos[1] * cell_size + cell_size // 2
-        center_y = player_pos[0] * cell_size + cell_size // 2
-        pygame.draw.circle(screen, (255, 215, 0), (center_x, center_y), range_radius, 2)
-
-    for proj in projectiles:
-        proj.update()
-        proj.draw()
-    projectiles[:] = [p for p in projectiles if p.active]
-
-    for ep in enemy_projectiles:
-        ep.update()
-        ep.draw()
-    enemy_projectiles[:] = [ep for ep in enemy_projectiles if ep.active]
-
+        rect = pygame.Rect(0, 0, 2 * range_radius + 2, 2 * range_radius + 2)
+        rect.center = (px + cell_size // 2, py + cell_size // 2)
+        sprites.append(('cursor', rect.union((px, py, cell_size, cell_size)), draw_cursor,
+                        (px, py, selected_tower, valid_tile, range_radius)))
+
+    for group, color in ((projectiles, (255, 215, 0)), (enemy_projectiles, (139, 0, 0))):
+        for proj in group:
+            x = int(proj.prev_x + (proj.x - proj.prev_x) * alpha)
+            y = int(proj.prev_y + (proj.y - proj.prev_y) * alpha)
+            sprites.append((('projectile', id(proj)), pygame.Rect(x - 6, y - 6, 13, 13), draw_projectile, (x, y, color)))
+
+    return sprites
+
+def draw_grid(sprites, area=None):
+    """Draws every sprite, or only those touching area."""
+    for key, rect, draw, args in sprites:
+        if area is None or rect.colliderect(area):
+            draw(*args)
+
+def remember_sprites(sprites):
+    global last_drawn
+    last_drawn = {key: (rect, args) for key, rect, draw, args in sprites}
+
+def merge_rects(rects):
+    """Unions overlapping rects until none overlap, so no pixel is drawn twice in a frame."""
+    merged = []
+    for rect in rects:
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect = rect.union(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+def redraw_dirty(sprites):
+    """
+    Repaints the regions covered by sprites that appeared, disappeared or
+    changed since the last frame: background first, then every sprite that
+    touches the region, clipped to it. Returns the repainted rects.
+    """
+    dirty = []
+    current = {key: (rect, args) for key, rect, draw, args in sprites}
+    for key, (rect, args) in current.items():
+        old = last_drawn.get(key)
+        if old is None:
+            dirty.append(rect)
+        elif old[1] != args or old[0] != rect:
+            dirty += [old[0], rect]
+    for key, (rect, args) in last_drawn.items():
+        if key not in current:
+            dirty.append(rect)
+    remember_sprites(sprites)
+
+    regions = merge_rects([rect.clip(grid_rect) for rect in dirty if rect.colliderect(grid_rect)])
+    for region in regions:
+        screen.set_clip(region)
+        screen.blit(background, region, region)
+        draw_grid(sprites, region)
+    screen.set_clip(None)
+    return regions
+
+
+def draw_ui(data, force=True):
+    """Draws the info panel; unless force, only when what it shows has changed. Returns whether it drew."""
+    global last_ui_state
+    ui_state = (selected_tower, data["current_wave"], data["coins"], len(data["towers"]), data["game_over"])
+    if not force and ui_state == last_ui_state:
+        return False
+    last_ui_state = ui_state
 
-def draw_ui():
-    data = game.get_game_data()
     ui_top = rows * cell_size
     ui_height = 200
 
     panel_color = (245, 245, 245)
     pygame.draw.rect(screen, panel_color, (0, ui_top, window_width, ui_height))
 
-    title_font = pygame.font.SysFont("arial", 28, bold=True)
-    label_font = pygame.font.SysFont("arial", 22)
-    value_font = pygame.font.SysFont("arial", 22, bold=True)
-    small_font = pygame.font.SysFont("arial", 18)
-
     def draw_label_value(label, value, x, y):
-        label_surface = label_font.render(label, True, (50, 50, 50))
-        value_surface = value_font.render(str(value), True, (0, 102, 204))
+        label_surface = text_cache.render(label, 22, (50, 50, 50), "arial")
+        value_surface = text_cache.render(str(value), 22, (0, 102, 204), "arial", bold=True)
         screen.blit(label_surface, (x, y))
         screen.blit(value_surface, (x + 180, y))
 
@@ -205,9 +384,9 @@ def draw_ui():
 
     if data["game_over"] or data["current_wave"] > game.env.max_waves:
         msg = "GAME WON!!" if data["current_wave"] > game.env.max_waves else "GAME OVER !!"
-        text = title_font.render(msg, True, (200, 0, 0))
+        text = text_cache.render(msg, 28, (200, 0, 0), "arial", bold=True)
         screen.blit(text, (window_width // 2 - 100, y_pad + 20))
-        return
+        return True
 
     # Info
     draw_label_value("Selected Tower:", selected_tower, x_pad, y_pad)
@@ -218,7 +397,7 @@ def draw_ui():
     # Controls
     control_x = window_width // 2 + 50
     control_y = y_pad
-    screen.blit(label_font.render("Controls", True, (60, 60, 60)), (control_x, control_y))
+    screen.blit(text_cache.render("Controls", 22, (60, 60, 60), "arial"), (control_x, control_y))
 
     controls = [
         "W / A / S / D  : Move Cursor",
@@ -227,19 +406,28 @@ def draw_ui():
         "V              : Start Wave",
     ]
     for i, line in enumerate(controls):
-        screen.blit(small_font.render(line, True, (30, 30, 30)), (control_x, control_y + 25 + i * 20))
+        screen.blit(text_cache.render(line, 18, (30, 30, 30), "arial"), (control_x, control_y + 25 + i * 20))
+    return True
 
 
-# Game refresh
-def refresh():
-    global last_spawn_time, show_cursor
-    screen.fill(WHITE)
-    now = pygame.time.get_ticks()
-    data = game.get_game_data()
-    show_cursor = not data["game_started"]
-    if data["game_started"] and now - last_spawn_time > spawn_delay:
+def sync_data():
+    """Brings data up to date with the game; returns the entries that changed."""
+    global generation
+    generation, changes = game.game_data_changes(generation)
+    data.update(changes)
+    return changes
+
+# Simulation step: agent moves, enemy ticks, firing and projectile flight at simulated time now
+def sim_step(now):
+    global last_spawn_time, last_agent_time
+    if agent_mode and game.env.is_terminal() == 'game_running' and now - last_agent_time >= agent_delay:
+        game.env.step(game.q_learning_step())
+        last_agent_time = now
+
+    if game.env.game_started and now - last_spawn_time > spawn_delay:
         game.spawn_enemies()
         last_spawn_time = now
+    sync_data()
 
     for pos, tower in data["towers"].items():
         tower_type = tower['type']
@@ -271,22 +459,84 @@ def refresh():
                 enemy_last_fired[key] = now
                 break
 
-    draw_grid()
-    draw_ui()
-    pygame.display.flip()
+    for group in (projectiles, enemy_projectiles):
+        for proj in group:
+            proj.update()
+        group[:] = [p for p in group if p.active]
+
+# Game refresh: draws the current state, between simulation steps
+def refresh():
+    global show_cursor, full_redraw
+    sync_data()
+    show_cursor = not data["game_started"]
+    sprites = grid_sprites(data, timestep.sim_time, timestep.alpha)
+    if dirty_rendering and not full_redraw:
+        rects = redraw_dirty(sprites)
+        if draw_ui(data, force=False):
+            rects.append(panel_rect)
+        pygame.display.update(rects)
+    else:
+        screen.blit(background, (0, 0))
+        draw_grid(sprites)
+        draw_ui(data)
+        remember_sprites(sprites)
+        pygame.display.flip()
+        full_redraw = False
+
+# Headless recording: the simulation runs flat out instead of against the clock, and only
+# every Nth step is drawn, straight into the (never displayed) screen surface.
+def reset_view(seed):
+    global last_spawn_time, last_agent_time, timestep, full_redraw, last_ui_state
+    random.seed(seed)
+    np.random.seed(seed)
+    game.env.seed(seed)
+    game.reset()
+    for state in (projectiles, enemy_projectiles, tower_spawn_time, tower_last_fired,
+                  enemy_last_fired, enemy_flash, enemy_shrink):
+        state.clear()
+    last_spawn_time = last_agent_time = 0
+    timestep = FixedTimestep(sim_step_ms, sim_speed)
+    full_redraw = True
+    last_ui_state = None
+
+def record_game(seed, path, every, max_sim_ms):
+    """Plays one agent game from seed and writes every `every`th step to path. Returns (steps, frames)."""
+    global show_cursor
+    reset_view(seed)
+    # Played back at sim_speed times real time
+    writer = frame_stream.open_writer(path, screen.get_size(), every * sim_step_ms / sim_speed)
+    steps = 0
+    done = False
+    while not done:
+        steps += 1
+        now = steps * sim_step_ms
+        timestep.sim_time = now
+        sim_step(now)
+        done = data["game_over"] or data["current_wave"] > game.env.max_waves or now >= max_sim_ms
+        if steps % every == 0 or done:
+            show_cursor = not data["game_started"]
+            screen.blit(background, (0, 0))
+            draw_grid(grid_sprites(data, now))
+            draw_ui(data)
+            writer.write(pygame.image.tobytes(screen, 'RGB'))
+    writer.close()
+    return steps, writer.frames
+
+def parse_seeds(text):
+    first, _, last = text.partition('-')
+    return range(int(first), int(last or first) + 1)
 
 # Key processing
 def process_key(event):
     global selected_tower
-    data = game.get_game_data()
-    if data["game_started"] or data["game_over"]:
+    sync_data()
+    if data["game_started"] or game.env.is_terminal() != 'game_running':
         return
     if event.type == pygame.KEYDOWN:
         if event.unicode in '123':
             tower = int(event.unicode)
-            if tower in data["available_towers"]:
+            if game.select_tower(tower):
                 selected_tower = tower
-                game.env.selected_tower = tower
         else:
             key_map = {
                 pygame.K_w: 'UP', pygame.K_s: 'DOWN', pygame.K_a: 'LEFT', pygame.K_d: 'RIGHT',
@@ -300,7 +550,22 @@ def process_key(event):
 clock = pygame.time.Clock()
 running = True
 agent_mode = False
-agent_timer = 0
+
+if args.record:
+    agent_mode = True
+    seeds = parse_seeds(args.seeds)
+    if len(seeds) > 1 and '{seed}' not in args.record:
+        parser.error('--record PATH needs a {seed} placeholder when recording several seeds')
+    for seed in seeds:
+        path = args.record.format(seed=seed)
+        start = time.perf_counter()
+        steps, frames = record_game(seed, path, max(args.every, 1), args.max_minutes * 60000)
+        elapsed = time.perf_counter() - start
+        sync_data()
+        result = "won" if data["current_wave"] > game.env.max_waves else "lost" if data["game_over"] else "cut off"
+        print(f"seed {seed}: {result} at wave {data['current_wave']}, {steps} steps, "
+              f"{frames} frames in {elapsed:.2f}s ({steps / elapsed:,.0f} steps/sec) -> {path}")
+    running = False
 
 while running:
     for event in pygame.event.get():
@@ -309,14 +574,15 @@ while running:
         elif not agent_mode:
             process_key(event)
 
-    if agent_mode and not game.get_game_data()["game_over"]:
-        agent_timer += clock.get_time()
-        if agent_timer >= 1200:
-            game.env.step(game.q_learning_step())
-            agent_timer = 0
+    for now in timestep.steps(clock.get_time()):
+        sim_step(now)
 
+    frame_start = time.perf_counter()
     refresh()
+    record_frame_time((time.perf_counter() - frame_start) * 1000)
     clock.tick(60)
 
+if not args.record:
+    print_frame_time_histogram()
 pygame.quit()
 sys.exit()
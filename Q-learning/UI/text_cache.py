@@ -0,0 +1,46 @@
+import pygame
+from collections import OrderedDict
+
+# Fonts are looked up once per (name, size, bold); SysFont searches the system font list on every call.
+fonts = {}
+
+# Rendered text surfaces, least recently used first. A label is rendered once, and a value
+# such as the coin count is only rendered again when its text changes.
+surfaces = OrderedDict()
+max_surfaces = 512
+hits = 0
+misses = 0
+evictions = 0
+
+
+def get_font(size, name=None, bold=False):
+    key = (name, size, bold)
+    font = fonts.get(key)
+    if font is None:
+        font = pygame.font.SysFont(name, size, bold=bold)
+        fonts[key] = font
+    return font
+
+
+def render(text, size, color, name=None, bold=False):
+    """get_font(size, name, bold).render(text, True, color), memoized."""
+    global hits, misses, evictions
+    key = (name, size, bold, text, tuple(color))
+    surface = surfaces.get(key)
+    if surface is not None:
+        hits += 1
+        surfaces.move_to_end(key)
+        return surface
+
+    misses += 1
+    surface = get_font(size, name, bold).render(text, True, color)
+    surfaces[key] = surface
+    if len(surfaces) > max_surfaces:
+        surfaces.popitem(last=False)
+        evictions += 1
+    return surface
+
+
+def cache_info():
+    return {'hits': hits, 'misses': misses, 'evictions': evictions,
+            'size': len(surfaces), 'maxsize': max_surfaces, 'fonts': len(fonts)}
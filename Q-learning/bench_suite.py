@@ -0,0 +1,204 @@
+import os
+import sys
+import io
+import json
+import time
+import random
+import argparse
+import resource
+import tracemalloc
+import contextlib
+import functools
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+UI_DIR = os.path.join(HERE, 'UI')
+sys.path.insert(0, UI_DIR)
+
+from tdg_env import TowerDefenseEnv
+
+BASELINE_PATH = os.path.join(HERE, 'bench_baseline.json')
+
+# Every non-path cell holds a tower, cycling through the three types.
+FULL_GRID = {(row, col): 1 + (row + col) % 3 for row in range(7) for col in range(7) if row != 3}
+
+
+def play(env, action):
+    """env.step(action), then plays the wave out when the env leaves that to the UI loop ('ticked' wave_mode)."""
+    result = env.step(action)
+    while env.game_started:
+        env.spawn_enemies()
+    return result
+
+
+def random_policy(env, steps, step_hook=None):
+    """Random actions, biased towards placing towers, resetting whenever an episode ends; START_WAVE actions count as waves."""
+    rng = np.random.RandomState(0)
+    actions = rng.choice(6, size=steps, p=[.1, .1, .1, .1, .45, .15]).tolist()
+    waves = 0
+    for action in actions:
+        _, _, done, _ = play(env, action)
+        waves += action == 5
+        if done:
+            env.reset()
+        if step_hook:
+            step_hook()
+    return waves
+
+
+def fixed_wave(env, waves, layout, max_enemies=None, step_hook=None):
+    """Starts wave 2 against a fixed tower layout over and over; every step is one whole wave."""
+    for _ in range(waves):
+        env.reset()
+        env.current_wave = 2  # Mixed enemy types
+        if max_enemies:
+            env.max_enemies = max_enemies
+        env.towers = {pos: {'type': t, 'health': env.tower_info[t]['health']} for pos, t in layout.items()}
+        env.wave_ready = True
+        play(env, 5)
+        if step_hook:
+            step_hook()
+    return waves
+
+
+def full_grid(env, waves, step_hook=None):
+    return fixed_wave(env, waves, FULL_GRID, step_hook=step_hook)
+
+
+def max_enemy_wave(env, waves, step_hook=None):
+    """64-enemy waves against the full grid: the path stays saturated until the towers fall."""
+    return fixed_wave(env, waves, FULL_GRID, max_enemies=64, step_hook=step_hook)
+
+
+def controller_frames(controller, frames, step_hook=None):
+    """The tdg_view agent loop without pygame: one wave tick or one agent action per frame."""
+    waves = 0
+    for _ in range(frames):
+        # Every frame here steps or ticks the game, so game_data_changes() would have nothing to skip.
+        data = controller.get_game_data()
+        if data['game_over'] or data['current_wave'] > controller.env.max_waves:
+            controller.reset()
+        elif data['game_started']:
+            controller.spawn_enemies()
+        else:
+            action = controller.q_learning_step()
+            controller.env.step(action)
+            waves += action == 5
+        if step_hook:
+            step_hook()
+    return waves
+
+
+def make_controller():
+    # GameController loads its Q-table relative to the UI directory.
+    from tdg_controller import GameController
+    cwd = os.getcwd()
+    os.chdir(UI_DIR)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return GameController()
+    finally:
+        os.chdir(cwd)
+
+
+# name -> (env factory, scenario, steps at scale 1)
+SCENARIOS = {
+    'train/random_policy': (TowerDefenseEnv, random_policy, 100000),
+    'train/full_grid': (TowerDefenseEnv, full_grid, 10000),
+    'train/max_enemy_wave': (TowerDefenseEnv, max_enemy_wave, 1500),
+    'ui/random_policy': (functools.partial(TowerDefenseEnv, wave_mode='ticked'), random_policy, 100000),
+    'ui/full_grid': (functools.partial(TowerDefenseEnv, wave_mode='ticked'), full_grid, 10000),
+    'ui/max_enemy_wave': (functools.partial(TowerDefenseEnv, wave_mode='ticked'), max_enemy_wave, 1500),
+    'ui/controller': (make_controller, controller_frames, 100000),
+}
+
+
+def seeded(factory, seed=0):
+    random.seed(seed)
+    np.random.seed(seed)
+    target = factory()
+    env = getattr(target, 'env', target)  # A GameController plays on its .env
+    if isinstance(env, TowerDefenseEnv):
+        env.reset(seed=seed)  # Draws from its own streams, not the global ones
+    return target
+
+
+def run_scenario(name, scale=1.0, alloc_steps=200):
+    """
+    Times the scenario from a fixed seed, then replays its first alloc_steps
+    steps under tracemalloc to get the mean peak memory a single step
+    allocates on top of what was live before it.
+    """
+    factory, scenario, steps = SCENARIOS[name]
+    steps = max(int(steps * scale), 1)
+
+    target = seeded(factory)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        waves = scenario(target, steps)
+    elapsed = time.perf_counter() - start
+
+    target = seeded(factory)
+    alloc = {'bytes': 0, 'current': 0}
+
+    def measure():
+        current, peak = tracemalloc.get_traced_memory()
+        alloc['bytes'] += peak - alloc['current']
+        alloc['current'] = current
+        tracemalloc.reset_peak()
+
+    tracemalloc.start()
+    alloc['current'] = tracemalloc.get_traced_memory()[0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        scenario(target, min(alloc_steps, steps), step_hook=measure)
+    tracemalloc.stop()
+
+    return {
+        'steps': steps,
+        'seconds': round(elapsed, 4),
+        'steps_per_sec': round(steps / elapsed, 1),
+        'waves_per_sec': round(waves / elapsed, 1),
+        'alloc_bytes_per_step': round(alloc['bytes'] / min(alloc_steps, steps), 1),
+        # Process-wide high-water mark, so it includes every scenario run before this one.
+        'peak_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Names of the throughput metrics that fell more than threshold below the baseline."""
+    regressions = []
+    for name, result in results.items():
+        for metric in ('steps_per_sec', 'waves_per_sec'):
+            old = baseline.get(name, {}).get(metric)
+            if old and result[metric] < old * (1 - threshold):
+                regressions.append(f"{name} {metric}: {result[metric]:,.1f} < {old:,.1f}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless TowerDefenseEnv / GameController benchmarks')
+    parser.add_argument('scenarios', nargs='*', help=f"subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplies every scenario\'s step count')
+    parser.add_argument('--out', help='also write the results JSON here')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed fractional slowdown')
+    parser.add_argument('--save-baseline', action='store_true', help='overwrite the baseline with these results')
+    args = parser.parse_args()
+
+    results = {name: run_scenario(name, args.scale) for name in (args.scenarios or SCENARIOS)}
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            f.write(output + '\n')
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1 @@
+from .env import TowerDefenseEnv, EnvRandom
@@ -0,0 +1,1010 @@
+import gym
+from gym import spaces
+import sys
+import random
+import time
+import numpy as np
+from array import array
+from collections import OrderedDict
+
+
+class EnvRandom:
+    """
+    The random streams of one env: a random.Random and an np.random.RandomState
+    seeded alike, read through prefetched buffers so a draw is an array lookup
+    rather than a call into the generator. The buffers are flat arrays of
+    machine words and doubles refilled in place, not lists of boxed numbers,
+    so a refill allocates little besides the raw batch. randint() and choice()
+    take one 32-bit word per attempt and reject out-of-range values exactly like
+    random.Random, and rand() is RandomState.rand(), so seed(s) gives the same
+    draws as random.seed(s) / np.random.seed(s) did for the module functions.
+
+    position() counts the draws taken from each generator since seed().
+    flat_state() is getstate() as a list of ints, for logs that store integers;
+    load_flat_state() restores it without replaying any draws.
+    """
+
+    prefetch = 64  # Draws per refill; a refill's temporaries take a few times 4 * prefetch bytes
+
+    def __init__(self, seed=None):
+        self.random = random.Random()
+        self.np_random = np.random.RandomState()
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        """None seeds from OS entropy; NumPy gets seeds of 32 bits or more as a list of 32-bit words."""
+        self.origin = seed
+        self.random.seed(seed)
+        if seed is not None and seed >= 2 ** 32:
+            seed = [(seed >> shift) & 0xffffffff for shift in range(0, seed.bit_length(), 32)]
+        self.np_random.seed(seed)
+        self.words = array('I')
+        self.pos = 0
+        self.uniforms = array('d')
+        self.uniform_pos = 0
+        self.words_read = 0
+        self.uniforms_read = 0
+
+    def position(self):
+        """(32-bit words, uniforms) read since the last seed()."""
+        return self.words_read + self.pos, self.uniforms_read + self.uniform_pos
+
+    def refill(self):
+        """Drops the words already read and appends a fresh batch; returns how many were dropped."""
+        dropped = self.pos
+        self.words_read += dropped
+        batch = array('I', self.random.getrandbits(32 * self.prefetch).to_bytes(4 * self.prefetch, 'little'))
+        if sys.byteorder == 'big':
+            batch.byteswap()
+        del self.words[:dropped]
+        self.words += batch
+        self.pos = 0
+        return dropped
+
+    def below(self, n):
+        """Uniform int in [0, n), for 0 < n < 2 ** 32."""
+        shift = 32 - n.bit_length()
+        while True:
+            if self.pos == len(self.words):
+                self.refill()
+            r = self.words[self.pos] >> shift
+            self.pos += 1
+            if r < n:
+                return r
+
+    def randint(self, a, b):
+        return a + self.below(b - a + 1)
+
+    def choice(self, seq):
+        return seq[self.below(len(seq))]
+
+    def peek_randints(self, a, b, count):
+        """The next count randint(a, b) draws, without consuming them."""
+        n = b - a + 1
+        shift = 32 - n.bit_length()
+        draws = []
+        pos = self.pos
+        while len(draws) < count:
+            if pos == len(self.words):
+                pos -= self.refill()
+            r = self.words[pos] >> shift
+            pos += 1
+            if r < n:
+                draws.append(a + r)
+        return draws
+
+    def rand(self):
+        if self.uniform_pos == len(self.uniforms):
+            self.uniforms_read += self.uniform_pos
+            del self.uniforms[:]
+            self.uniforms.frombytes(self.np_random.random_sample(self.prefetch).tobytes())
+            self.uniform_pos = 0
+        self.uniform_pos += 1
+        return self.uniforms[self.uniform_pos - 1]
+
+    def getstate(self):
+        """Generator states plus unread buffers; slow (~100 us), and comparable with ==."""
+        name, key, pos, has_gauss, cached_gaussian = self.np_random.get_state()
+        return (self.random.getstate(), (name, tuple(key.tolist()), pos, has_gauss, cached_gaussian),
+                tuple(self.words[self.pos:]), tuple(self.uniforms[self.uniform_pos:]),
+                (self.origin, *self.position()))
+
+    def setstate(self, state):
+        random_state, (name, key, pos, has_gauss, cached_gaussian), words, uniforms, position = state
+        self.origin, self.words_read, self.uniforms_read = position
+        self.random.setstate(random_state)
+        self.np_random.set_state((name, np.array(key, dtype=np.uint32), pos, has_gauss, cached_gaussian))
+        self.words, self.pos = array('I', words), 0
+        self.uniforms, self.uniform_pos = array('d', uniforms), 0
+
+    def flat_state(self):
+        """
+        The random.Random key (624 words and index), the RandomState key and
+        index, position(), then the unread words and the bit patterns of the
+        unread uniforms, each run prefixed with its length. EnvRandom never
+        draws Gaussians, so the generators' cached ones are left out.
+        """
+        version, internal, gauss_next = self.random.getstate()
+        name, key, pos, has_gauss, cached_gaussian = self.np_random.get_state()
+        words = self.words[self.pos:]
+        uniform_bits = array('Q', self.uniforms[self.uniform_pos:].tobytes())
+        return [*internal, *key.tolist(), pos, *self.position(),
+                len(words), *words, len(uniform_bits), *uniform_bits]
+
+    def load_flat_state(self, state):
+        """Restores a flat_state(); constant time, whatever the position."""
+        # Both generators are MT19937: a 624-word key plus the index of the next word.
+        self.random.setstate((self.random.VERSION, tuple(state[:625]), None))
+        self.np_random.set_state(('MT19937', np.array(state[625:1249], dtype=np.uint32), state[1249], 0, 0.0))
+        self.words_read, self.uniforms_read = state[1250:1252]
+        count, i = state[1252], 1253
+        self.words, self.pos = array('I', state[i:i + count]), 0
+        count, i = state[i + count], i + count + 1
+        self.uniforms = array('d', array('Q', state[i:i + count]).tobytes())
+        self.uniform_pos = 0
+
+
+class TowerDefenseEnv(gym.Env):
+    metadata = {'render.modes': ['human']}
+
+    # Methods timed by enable_profiling(), outermost first.
+    profiled_phases = ('step', 'play_turn', 'move_cursor', 'place_tower', 'start_wave',
+                       'resolve_wave_cached', 'resolve_wave', 'spawn_enemies', 'resolve_combat', 'get_observation')
+
+    # State the views show that can change during a game, each with its own generation (see touch()).
+    tracked_fields = ('towers', 'enemies', 'player_pos', 'selected_tower', 'current_wave', 'coins',
+                      'available_towers', 'game_over', 'game_started', 'start_time')
+
+    def __init__(self, wave_mode='instant', wave_engine='ticked', wave_cache_size=0, profile=False, seed=None):
+        """
+        wave_mode picks who plays a started wave out. 'instant' (training)
+        resolves it inside start_wave(), which returns the wave's reward.
+        'ticked' (the UI, which animates every tick) only starts it; the caller
+        then calls spawn_enemies() once per tick until game_started is False.
+        Both modes wrap a wave up the same way, drawing from self.rng in the
+        same order, so a seed and a list of actions give the same game in
+        either (see tdg_env.parity).
+
+        wave_engine picks how 'instant' mode plays out a wave: 'ticked' loops
+        update_enemies(), 'fast' uses fast_forward_wave(), and 'check' runs both
+        and raises AssertionError if they disagree.
+
+        wave_cache_size > 0 keeps that many wave outcomes in an LRU cache (see
+        resolve_wave_cached); the cache survives reset().
+
+        profile=True turns on enable_profiling() from the start.
+
+        Every random draw comes from the env's own EnvRandom, self.rng, seeded
+        with seed (see seed()), never from the random / np.random modules.
+        """
+        super(TowerDefenseEnv, self).__init__()
+        if wave_mode not in ('instant', 'ticked'):
+            raise ValueError(f"Unknown wave_mode {wave_mode!r}")
+        self.wave_mode = wave_mode
+        if wave_engine not in ('ticked', 'fast', 'check'):
+            raise ValueError(f"Unknown wave_engine {wave_engine!r}")
+        self.wave_engine = wave_engine
+        self.rng = EnvRandom(seed)
+        self.generation = 0
+        self.generations = dict.fromkeys(self.tracked_fields, 0)
+        self.wave_cache_size = wave_cache_size
+        self.wave_cache = OrderedDict()
+        self.wave_cache_hits = 0
+        self.wave_cache_misses = 0
+        self.wave_cache_evictions = 0
+        self.reset_stats()
+        if profile:
+            self.enable_profiling()
+        self.rows, self.cols = 7, 7
+        self.path_row = 3
+        self.max_waves = 5
+        self.current_wave = 1
+        self.available_towers = [1]
+        self.selected_tower = 1
+        self.max_enemies = 4
+        self.coins = 70
+        self.wave_ready = False
+        self.enemy_count = 0
+        self.game_started = False
+        self.game_over = False
+        self.game_running = False
+        self.allow_tower_placement = True
+        self.towers = {}
+        self.start_time = None  # When the UI started the current wave; the env never reads it
+        self.clear_enemies()
+
+        self.tower_info = {
+            1: {'color': (0, 255, 0), 'health': 20, 'damage': 10, 'range': 2, 'cost': 15},
+            2: {'color': (0, 0, 255), 'health': 25, 'damage': 15, 'range': 3, 'cost': 20},
+            3: {'color': (255, 255, 0), 'health': 30, 'damage': 20, 'range': 3, 'cost': 25}
+        }
+
+        self.enemy_info = {
+            0: {'color': (0, 128, 128), 'health': 10, 'damage': 10, 'range': 1},
+            1: {'color': (128, 0, 0), 'health': 20, 'damage': 13, 'range': 2}
+        }
+
+        self.rewards = {
+            'tower_placed_success': 10,
+            'tower_placed_fail': -10,
+            'wave_won': 1000,
+            'wave_lost': -5000,
+            'game_won': 5000,
+        }
+        self.build_combat_tables()
+
+        self.actions = ['UP', 'DOWN', 'LEFT', 'RIGHT', 'PLACE_TOWER', 'START_WAVE']
+        self.action_space = spaces.Discrete(len(self.actions), seed=seed)
+
+        self.observation_space = spaces.Dict({
+            'current_position': spaces.Tuple((spaces.Discrete(self.rows), spaces.Discrete(self.cols))),
+            'current_selected_tower': spaces.Discrete(len(self.tower_info) + 1)
+        })
+
+        self.reset()
+
+    def seed(self, seed=None):
+        """Reseeds the env's random streams and its action_space; None seeds from OS entropy."""
+        self.rng.seed(seed)
+        self.action_space.seed(seed)
+        return [seed]
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed(seed)
+        self.towers = {}
+        self.clear_enemies()
+        self.selected_tower = 1
+        self.player_pos = [self.rng.randint(0, self.rows - 1), self.rng.randint(0, self.cols - 1)]
+        self.current_wave = 1
+        self.wave_ready = False
+        self.enemy_count = 0
+        self.max_enemies = 4
+        self.allow_tower_placement = True
+        self.game_started = False
+        self.game_over = False
+        self.game_running = False
+        self.available_towers = [1]  # Reset tower availability
+        self.coins = 70
+        self.touch(*self.tracked_fields)
+
+        return self.get_observation(), 0, False, {}
+
+    def get_observation(self):
+        return {
+            'current_position': tuple(self.player_pos),
+            'current_selected_tower': self.selected_tower
+        }
+
+    def touch(self, *fields):
+        """
+        Records that the tracked fields named changed: self.generation counts
+        up once per call and every field named gets the new value, so a
+        consumer that has seen generation g only needs the fields in
+        changes_since(g). The public methods that change a field touch it.
+        """
+        self.generation += 1
+        generations = self.generations
+        for field in fields:
+            generations[field] = self.generation
+
+    def changes_since(self, generation):
+        """(current generation, tracked fields touched after generation)."""
+        if generation >= self.generation:
+            return self.generation, []
+        return self.generation, [field for field, touched in self.generations.items() if touched > generation]
+
+    def is_terminal(self):
+        if self.game_over:
+            return 'game_over'
+        elif self.current_wave > self.max_waves:
+            return 'game_won'
+        else:
+            return "game_running"
+
+    def step(self, action):
+        if isinstance(action, str):
+            action = self.actions.index(action)
+
+        action_name = self.actions[action]
+        result, reward = self.play_turn(action_name)
+
+        if action_name == 'START_WAVE':
+            if not self.wave_ready:
+                reward -= 500
+            else:
+                self.wave_ready = False
+
+        info = {'result': result, 'action': action_name}
+        done = False
+        terminal_state = self.is_terminal()
+        if terminal_state == 'game_won':
+            done = True
+        elif terminal_state == 'game_over':
+            done = True
+        else:
+            done = False
+
+        obs = self.get_observation()
+
+        return obs, reward, done, info
+
+    def move_cursor(self, action):
+        x, y = self.player_pos
+        moves = {'UP': (-1, 0), 'DOWN': (1, 0), 'LEFT': (0, -1), 'RIGHT': (0, 1)}
+        if action in moves:
+            dx, dy = moves[action]
+            new_x, new_y = x + dx, y + dy
+            if 0 <= new_x < self.rows and 0 <= new_y < self.cols:
+                self.player_pos = [new_x, new_y]
+                # touch('player_pos') inlined here and in move_cursor_to_random_adjacent():
+                # one of the two runs on most steps.
+                self.generation += 1
+                self.generations['player_pos'] = self.generation
+                return f"Moved {action}!", 0
+            return "Out of bounds!", -1
+
+    def switch_tower(self):
+        idx = self.available_towers.index(self.selected_tower)
+        self.selected_tower = self.available_towers[(idx + 1) % len(self.available_towers)]
+        self.touch('selected_tower')
+        return f"Switched to Tower {self.selected_tower}", 0
+
+    def move_cursor_to_random_adjacent(self):
+        """Move cursor to a random adjacent cell without going out of bounds"""
+        x, y = self.player_pos
+        directions = [(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]
+
+        # Filter out-of-bounds positions
+        adjacent_positions = [
+            pos for pos in directions
+            if 0 <= pos[0] < self.rows and 0 <= pos[1] < self.cols
+        ]
+        # Move player to a random adjacent position
+        if adjacent_positions:
+            self.player_pos = self.rng.choice(adjacent_positions)
+            self.generation += 1
+            self.generations['player_pos'] = self.generation
+
+    def place_tower(self):
+        if self.allow_tower_placement == False:
+            return "Cant place tower because wave in progress", 0
+        if self.rng.rand() < 0.5 and self.current_wave>1:
+            self.switch_tower()
+        pos = tuple(self.player_pos)
+        if pos in self.towers:
+            self.move_cursor_to_random_adjacent()
+            return "Tower already placed here, moved to adjacent cell!", 0
+        if pos[0] == self.path_row:
+            self.move_cursor_to_random_adjacent()
+            return "Cannot place on enemy path, moved to adjacent cell!", 0
+        cost = self.tower_info[self.selected_tower]['cost']
+        if self.coins < cost:
+            return self.start_wave()
+
+        self.wave_ready = True
+        self.coins -= cost
+        self.towers[pos] = {'type': self.selected_tower, 'health': self.tower_info[self.selected_tower]['health']}
+        self.touch('coins', 'towers')
+        self.move_cursor_to_random_adjacent()
+        return "Tower placed and moved to adjacent cell!", self.rewards['tower_placed_success']
+
+    def start_wave(self):
+        if self.game_started:
+            return "Wave already started!", 0
+        self.allow_tower_placement = False
+        self.game_started = True
+        self.game_running = True
+        if self.wave_mode == 'ticked':
+            self.touch('game_started')
+            return "Wave started!", 0
+        temp_wave = self.current_wave
+        if self.wave_cache_size > 0:
+            self.resolve_wave_cached()
+        else:
+            self.resolve_wave()
+        self.touch('towers', 'enemies', 'current_wave', 'coins', 'game_over', 'game_started')
+        self.finish_wave()
+        rew = None
+        
+        if self.is_terminal() == 'game_won':
+            rew = self.rewards['game_won']
+        elif self.is_terminal() == 'game_running' and self.current_wave == (temp_wave + 1):
+            rew = self.rewards['wave_won']
+        else:
+            rew = self.rewards['wave_lost']
+        return "Wave started!", rew
+
+    def finish_wave(self):
+        """Wraps up a wave that has just ended, won or lost."""
+        self.move_cursor_to_random_adjacent() # CHANGE HERE
+        self.end_wave(not self.game_over)
+
+    def spawn_enemies(self):
+        """Generates enemies based on the current wave number."""
+        started = self.game_started
+        self.update_enemies()
+        if self.wave_mode == 'ticked' and started and not self.game_started:
+            self.finish_wave()
+        return "Enemies spawned!"
+
+    def build_combat_tables(self):
+        """
+        Precomputes, for every tower type and cell, the path columns inside the
+        tower's range, and for every enemy type and path column, the cells the
+        enemy can counterattack from there. ring_slots[enemy_offset] lists each
+        path column with its enemy ring slot, right to left (the order enemies
+        spawn in), for resolve_combat() and the enemies snapshot, which also
+        uses enemy_colors, each enemy type's color.
+        """
+        cells = [(row, col) for row in range(self.rows) for col in range(self.cols)]
+        self.ring_slots = [tuple((x, (x + offset) % self.cols) for x in range(self.cols - 1, -1, -1))
+                           for offset in range(self.cols)]
+        self.enemy_colors = {e: info['color'] for e, info in self.enemy_info.items()}
+        self.tower_columns = {
+            t: {(row, col): tuple((x, info['damage']) for x in range(self.cols)
+                                  if abs(row - self.path_row) + abs(col - x) <= info['range'])
+                for row, col in cells}
+            for t, info in self.tower_info.items()
+        }
+        self.column_targets = {}
+        for x in range(self.cols):
+            self.add_column_targets(x)
+
+    def add_column_targets(self, x):
+        """Builds the counterattack table for path column x (also used for enemies off the grid)."""
+        self.column_targets[x] = {
+            e: tuple((row, col) for row in range(self.rows) for col in range(self.cols)
+                     if abs(row - self.path_row) + abs(col - x) <= info['range'])
+            for e, info in self.enemy_info.items()
+        }
+
+    def clear_enemies(self):
+        """
+        Enemies all walk path_row one cell per tick, so they live in a ring of
+        parallel lists with one slot per path column: the enemy at column x is
+        in slot (x + enemy_offset) % cols, an empty slot has type -1, and moving
+        every enemy one cell left is a single enemy_offset increment.
+        """
+        self.enemy_type = [-1] * self.cols
+        self.enemy_health = [0] * self.cols
+        self.enemy_offset = 0
+        self.enemies_alive = 0
+        self.enemies_snapshot = (None, [])
+        # (towers dict, 'towers' generation, damage per path column) resolve_combat() last summed up;
+        # cleared along with the enemies so it never keeps a replaced towers dict alive.
+        self.column_damage_cache = (None, None, [])
+
+    @property
+    def enemies(self):
+        """
+        Snapshot of the live enemies as dicts, oldest (leftmost) first. The views
+        read it several times per frame, so the same list is returned until the
+        'enemies' generation moves on (see touch()); treat it as read-only. Code
+        changing the ring outside update_enemies() must touch('enemies').
+        """
+        if not self.enemies_alive:
+            return []
+        generation = self.generations['enemies']
+        if generation == self.enemies_snapshot[0]:
+            return self.enemies_snapshot[1]
+        # Rebuilt on every tick a view draws, so a plain loop (about half a comprehension's cost
+        # here), right to left like resolve_combat() until every live enemy has been seen.
+        types, healths, colors = self.enemy_type, self.enemy_health, self.enemy_colors
+        enemies = []
+        remaining = self.enemies_alive
+        for x, slot in self.ring_slots[self.enemy_offset]:
+            enemy_type = types[slot]
+            if enemy_type >= 0:
+                enemies.append({'x': x, 'type': enemy_type, 'health': healths[slot], 'color': colors[enemy_type]})
+                remaining -= 1
+                if not remaining:
+                    break
+        enemies.reverse()
+        self.enemies_snapshot = (generation, enemies)
+        return enemies
+
+    @enemies.setter
+    def enemies(self, enemies):
+        self.clear_enemies()
+        for enemy in enemies:
+            if not 0 <= enemy['x'] < self.cols:
+                raise ValueError(f"Enemy x={enemy['x']} is off the path")
+            self.enemy_type[enemy['x']] = enemy['type']
+            self.enemy_health[enemy['x']] = enemy['health']
+            self.enemies_alive += 1
+        self.touch('enemies')
+
+    def resolve_combat(self):
+        """
+        Every tower hits every enemy in its range and every enemy hits back every
+        tower in its range, all from the health values at the start of the round;
+        towers and enemies at or below 0 health are removed afterwards.
+        """
+        if not self.enemies_alive:
+            return
+        towers = self.towers
+        cols = self.cols
+
+        # Damage landing on each path column this round. It only depends on where
+        # the towers stand, so it is summed again only once a tower is placed or
+        # destroyed (or the towers dict replaced), not on every tick; code adding or
+        # removing towers in place must touch('towers').
+        cached_towers, cached_generation, column_damage = self.column_damage_cache
+        if towers is not cached_towers or self.generations['towers'] != cached_generation:
+            tower_columns = self.tower_columns
+            column_damage = [0] * cols
+            for pos, tower in towers.items():
+                for x, damage in tower_columns[tower['type']][pos]:
+                    column_damage[x] += damage
+            self.column_damage_cache = (towers, self.generations['towers'], column_damage)
+
+        enemy_type, enemy_health = self.enemy_type, self.enemy_health
+        column_targets = self.column_targets
+        towers_hit = []
+        # Enemies spawn at the right end and walk left, so scan from there and stop
+        # once every live enemy has been seen.
+        remaining = self.enemies_alive
+        for x, slot in self.ring_slots[self.enemy_offset]:
+            kind = enemy_type[slot]
+            if kind >= 0:
+                remaining -= 1
+                if towers:
+                    enemy_damage = self.enemy_info[kind]['damage']
+                    for pos in column_targets[x][kind]:
+                        if pos in towers:  # Most cells in range are empty; `in` skips a method call for those
+                            towers[pos]['health'] -= enemy_damage
+                            towers_hit.append(pos)
+                health = enemy_health[slot] - column_damage[x]
+                if health > 0:
+                    enemy_health[slot] = health
+                else:
+                    enemy_type[slot] = -1
+                    enemy_health[slot] = 0
+                    self.enemies_alive -= 1
+                if not remaining:
+                    break
+        if towers_hit:
+            self.generations['towers'] = self.generation
+            destroyed = False
+            for pos in towers_hit:
+                if pos in towers and towers[pos]['health'] <= 0:
+                    del towers[pos]
+                    destroyed = True
+            if not destroyed:  # Only healths changed, so column_damage still holds
+                self.column_damage_cache = (towers, self.generation, column_damage)
+
+    def update_enemies(self):
+        """
+        Updates enemy positions and resolves combat.
+        Moves each live enemy one cell to the left.
+        If any live enemy reaches x < 0, the game is marked as over.
+        If no enemies remain while the wave is active, the wave is ended.
+        """
+        if self.current_wave > self.max_waves and not self.game_over:  # is_terminal() == 'game_won'
+            self.game_started = False
+            self.touch('game_started')
+            return
+
+        # An enemy standing in column 0 has reached the end of the path.
+        if self.enemy_type[self.enemy_offset] >= 0:
+            self.game_started = False
+            self.allow_tower_placement = True
+            self.game_over = True
+            self.touch('game_started', 'game_over')
+            return
+
+        spawning = self.enemy_count < self.max_enemies
+        if spawning:
+            allowed_enemy_max = len(self.enemy_info)
+            enemy_type = self.rng.randint(1, allowed_enemy_max)
+            if self.current_wave == 1:
+                enemy_type = 1
+
+        # touch('enemies') inlined, as this runs every tick; resolve_combat() stamps
+        # 'towers' with the same generation if an enemy hits one.
+        self.generation += 1
+        self.generations['enemies'] = self.generation
+        self.resolve_combat()
+
+        # Move everyone one cell left; the vacated column-0 slot becomes column cols - 1.
+        self.enemy_offset += 1
+        if self.enemy_offset == self.cols:
+            self.enemy_offset = 0
+
+        if spawning:
+            slot = self.enemy_offset - 1
+            self.enemy_type[slot] = enemy_type - 1
+            self.enemy_health[slot] = self.enemy_info[enemy_type - 1]['health']
+            self.enemies_alive += 1
+            self.enemy_count += 1
+
+        if self.enemy_count >= self.max_enemies and self.enemies_alive == 0:
+            self.current_wave += 1
+            self.enemy_count = 0
+            self.coins += self.current_wave * 15
+            self.allow_tower_placement = True
+            self.game_started = False
+            self.touch('current_wave', 'coins', 'game_started')
+
+    def resolve_wave(self):
+        """Plays the started wave out to the end with the configured wave_engine."""
+        if self.wave_engine == 'fast':
+            self.fast_forward_wave()
+        elif self.wave_engine == 'check':
+            self.check_wave_engines()
+        else:
+            # update_enemies(), not spawn_enemies(): only a ticked wave is played through spawn_enemies().
+            while self.game_started:
+                self.update_enemies()
+
+    def resolve_wave_cached(self):
+        """
+        resolve_wave() behind an LRU cache of wave outcomes.
+
+        A wave is fully determined by the towers (position, type, health), the
+        enemies already on the path, the wave number and the enemy types it
+        draws. The draws are peeked from self.rng without consuming them, so a
+        hit replays exactly the draws the wave would have consumed and the env
+        ends up in the same state, random stream included, as on a miss.
+        Coins are left out of the key; the outcome stores the coins gained.
+        """
+        cols = self.cols
+        offset = self.enemy_offset
+        spawns = max(self.max_enemies - self.enemy_count, 0)
+        if self.current_wave == 1:
+            draws = (1,) * spawns
+        else:
+            draws = tuple(self.rng.peek_randints(1, len(self.enemy_info), spawns))
+        key = (
+            tuple(sorted((pos, tower['type'], tower['health']) for pos, tower in self.towers.items())),
+            tuple(self.enemy_type[offset:] + self.enemy_type[:offset]),
+            tuple(self.enemy_health[offset:] + self.enemy_health[:offset]),
+            self.enemy_count, self.current_wave, self.game_over, draws,
+        )
+
+        outcome = self.wave_cache.get(key)
+        if outcome is None:
+            self.wave_cache_misses += 1
+            start_wave, start_count, start_coins = self.current_wave, self.enemy_count, self.coins
+            self.resolve_wave()
+            new_offset = self.enemy_offset
+            num_draws = spawns if self.current_wave != start_wave else self.enemy_count - start_count
+            self.wave_cache[key] = (
+                {pos: tower['health'] for pos, tower in self.towers.items()},
+                self.enemy_type[new_offset:] + self.enemy_type[:new_offset],
+                self.enemy_health[new_offset:] + self.enemy_health[:new_offset],
+                (new_offset - offset) % cols, self.enemy_count, self.current_wave,
+                self.coins - start_coins, self.game_over, self.allow_tower_placement, num_draws,
+            )
+            if len(self.wave_cache) > self.wave_cache_size:
+                self.wave_cache.popitem(last=False)
+                self.wave_cache_evictions += 1
+            return
+
+        self.wave_cache_hits += 1
+        self.wave_cache.move_to_end(key)
+        (tower_health, enemy_type, enemy_health, shift, self.enemy_count, self.current_wave,
+         coins_gained, self.game_over, self.allow_tower_placement, num_draws) = outcome
+        for _ in range(num_draws):
+            self.rng.randint(1, len(self.enemy_info))
+        for pos in list(self.towers):
+            if pos in tower_health:
+                self.towers[pos]['health'] = tower_health[pos]
+            else:
+                del self.towers[pos]
+        self.enemy_offset = (offset + shift) % cols
+        self.enemy_type = enemy_type[cols - self.enemy_offset:] + enemy_type[:cols - self.enemy_offset]
+        self.enemy_health = enemy_health[cols - self.enemy_offset:] + enemy_health[:cols - self.enemy_offset]
+        self.enemies_alive = cols - self.enemy_type.count(-1)
+        self.coins += coins_gained
+        self.game_started = False
+
+    def wave_cache_info(self):
+        """Hit / miss / eviction counters and current size of the wave outcome cache."""
+        return {
+            'hits': self.wave_cache_hits,
+            'misses': self.wave_cache_misses,
+            'evictions': self.wave_cache_evictions,
+            'size': len(self.wave_cache),
+            'maxsize': self.wave_cache_size,
+        }
+
+    def fast_forward_wave(self):
+        """
+        Plays out the rest of the wave as a stream of (tick, enemy, column)
+        events and leaves the env exactly as looping update_enemies() until
+        game_started is False would.
+
+        An enemy that enters the path at tick s stands in column cols + s - t
+        during tick t, so positions never need updating, the oldest enemy is
+        always the next to leak, and per-column tower damage only changes when a
+        tower dies. Once no towers are left the rest of the wave is settled in
+        closed form. Enemy types are drawn from self.rng in the same order as the
+        ticked loop draws them.
+        """
+        if self.current_wave > self.max_waves and not self.game_over:  # is_terminal() == 'game_won'
+            self.game_started = False
+            return
+
+        cols = self.cols
+        towers = self.towers
+        column_targets = self.column_targets
+        enemy_info = self.enemy_info
+
+        # [entry, type, health] of every live enemy, oldest first; it stands in column entry - t at tick t.
+        enemies = []
+        for x in range(cols):
+            slot = (x + self.enemy_offset) % cols
+            if self.enemy_type[slot] >= 0:
+                enemies.append([x + 1, self.enemy_type[slot], self.enemy_health[slot]])
+        spawns = max(self.max_enemies - self.enemy_count, 0)
+
+        column_damage = [0] * cols
+        for pos, tower in towers.items():
+            for x, damage in self.tower_columns[tower['type']][pos]:
+                column_damage[x] += damage
+
+        tick = 0
+        while True:
+            tick += 1
+
+            if not towers and (enemies or tick <= spawns):
+                # Nothing can hurt the enemies any more: the oldest one walks off
+                # the path and every spawn before that still happens.
+                leak_tick = min(enemies[0][0] if enemies else cols + tick, cols + tick)
+                for spawn_tick in range(tick, min(spawns + 1, leak_tick)):
+                    enemy_type = self.rng.randint(1, len(enemy_info))
+                    if self.current_wave == 1:
+                        enemy_type = 1
+                    enemies.append([cols + spawn_tick, enemy_type - 1, enemy_info[enemy_type - 1]['health']])
+                    leak_tick = min(leak_tick, cols + spawn_tick)
+                tick = leak_tick
+
+            # An enemy standing in column 0 has reached the end of the path.
+            if enemies and enemies[0][0] == tick:
+                offset = (self.enemy_offset + tick - 1) % cols
+                self.clear_enemies()
+                self.enemy_offset = offset
+                for entry, kind, health in enemies:
+                    slot = (entry - tick + self.enemy_offset) % cols
+                    self.enemy_type[slot] = kind
+                    self.enemy_health[slot] = health
+                    self.enemies_alive += 1
+                self.enemy_count += min(tick - 1, spawns)
+                self.game_started = False
+                self.allow_tower_placement = True
+                self.game_over = True
+                return
+
+            spawning = tick <= spawns
+            if spawning:
+                enemy_type = self.rng.randint(1, len(enemy_info))
+                if self.current_wave == 1:
+                    enemy_type = 1
+
+            if enemies:
+                destroyed = []
+                enemy_died = False
+                for enemy in enemies:
+                    x = enemy[0] - tick
+                    if towers:
+                        enemy_damage = enemy_info[enemy[1]]['damage']
+                        for pos in column_targets[x][enemy[1]]:
+                            tower = towers.get(pos)
+                            if tower is not None:
+                                tower['health'] -= enemy_damage
+                                if tower['health'] <= 0:
+                                    destroyed.append(pos)
+                    enemy[2] -= column_damage[x]
+                    if enemy[2] <= 0:
+                        enemy_died = True
+                if enemy_died:
+                    enemies = [enemy for enemy in enemies if enemy[2] > 0]
+                for pos in destroyed:
+                    if pos in towers:
+                        for x, damage in self.tower_columns[towers[pos]['type']][pos]:
+                            column_damage[x] -= damage
+                        del towers[pos]
+
+            if spawning:
+                enemies.append([cols + tick, enemy_type - 1, enemy_info[enemy_type - 1]['health']])
+            elif not enemies:
+                offset = (self.enemy_offset + tick) % cols
+                self.clear_enemies()
+                self.enemy_offset = offset
+                self.current_wave += 1
+                self.enemy_count = 0
+                self.coins += self.current_wave * 15
+                self.allow_tower_placement = True
+                self.game_started = False
+                return
+
+    def wave_state(self):
+        """Everything a wave can change, for comparing wave engines."""
+        return {
+            'towers': [(pos, tower['type'], tower['health']) for pos, tower in self.towers.items()],
+            'enemy_type': list(self.enemy_type),
+            'enemy_health': list(self.enemy_health),
+            'enemy_offset': self.enemy_offset,
+            'enemies_alive': self.enemies_alive,
+            'enemy_count': self.enemy_count,
+            'current_wave': self.current_wave,
+            'coins': self.coins,
+            'game_started': self.game_started,
+            'game_over': self.game_over,
+            'allow_tower_placement': self.allow_tower_placement,
+            'random_state': self.rng.getstate(),
+        }
+
+    def load_wave_state(self, state):
+        self.towers = {pos: {'type': kind, 'health': health} for pos, kind, health in state['towers']}
+        self.enemy_type = list(state['enemy_type'])
+        self.enemy_health = list(state['enemy_health'])
+        self.enemy_offset = state['enemy_offset']
+        self.enemies_alive = state['enemies_alive']
+        self.enemy_count = state['enemy_count']
+        self.current_wave = state['current_wave']
+        self.coins = state['coins']
+        self.game_started = state['game_started']
+        self.game_over = state['game_over']
+        self.allow_tower_placement = state['allow_tower_placement']
+        self.rng.setstate(state['random_state'])
+        self.touch(*self.tracked_fields)
+
+    def episode_state(self):
+        """
+        Everything that can differ between two games at the same step, as a
+        flat list of ints of fixed length: scalars first, then the enemy ring,
+        then (type, health) for every grid cell, 0 for no tower.
+        """
+        towers = [0] * (2 * self.rows * self.cols)
+        for (row, col), tower in self.towers.items():
+            i = 2 * (row * self.cols + col)
+            towers[i], towers[i + 1] = tower['type'], tower['health']
+        return [self.player_pos[0], self.player_pos[1], self.selected_tower, self.current_wave,
+                self.coins, self.enemy_count, self.max_enemies, sum(1 << t for t in self.available_towers),
+                int(self.wave_ready), int(self.allow_tower_placement), int(self.game_started),
+                int(self.game_over), int(self.game_running), self.enemy_offset, self.enemies_alive,
+                *self.enemy_type, *self.enemy_health, *towers]
+
+    def load_episode_state(self, state):
+        (row, col, self.selected_tower, self.current_wave, self.coins, self.enemy_count,
+         self.max_enemies, available, wave_ready, allow_tower_placement, game_started, game_over,
+         game_running, self.enemy_offset, self.enemies_alive) = state[:15]
+        self.player_pos = [row, col]
+        self.available_towers = [t for t in self.tower_info if available & (1 << t)]
+        self.wave_ready = bool(wave_ready)
+        self.allow_tower_placement = bool(allow_tower_placement)
+        self.game_started = bool(game_started)
+        self.game_over = bool(game_over)
+        self.game_running = bool(game_running)
+        cols = self.cols
+        self.enemy_type = list(state[15:15 + cols])
+        self.enemy_health = list(state[15 + cols:15 + 2 * cols])
+        towers = state[15 + 2 * cols:]
+        self.towers = {}
+        for i in range(0, len(towers), 2):
+            if towers[i]:
+                self.towers[divmod(i // 2, cols)] = {'type': towers[i], 'health': towers[i + 1]}
+        self.touch(*self.tracked_fields)
+
+    def check_wave_engines(self):
+        """Resolves the wave with both engines from the same state and checks they agree."""
+        start = self.wave_state()
+        self.fast_forward_wave()
+        fast = self.wave_state()
+        self.load_wave_state(start)
+        while self.game_started:
+            self.spawn_enemies()
+        ticked = self.wave_state()
+        if fast != ticked:
+            diff = {key: (fast[key], ticked[key]) for key in ticked if key != 'random_state' and fast[key] != ticked[key]}
+            raise AssertionError(f"Wave engines disagree (fast, ticked): {diff or 'random state'}")
+
+    def enable_profiling(self):
+        """
+        Shadows every method in profiled_phases with an instance attribute that
+        adds its call count and inclusive wall time (ns) to stats(), and counts
+        the waves played and the enemies spawned / killed and towers destroyed
+        by each. Those are counted between start_wave() and finish_wave(), so
+        both wave modes report the same numbers; a ticked wave spends its time
+        in spawn_enemies() rather than resolve_wave(). Nothing is wrapped while
+        profiling is off, so a disabled env runs the plain class methods at no
+        extra cost.
+        """
+        if self.profiling:
+            return
+        for name in self.profiled_phases:
+            method = getattr(self, name)
+            if name == 'start_wave':
+                method = self.counted_start_wave(method)
+            setattr(self, name, self.timed_phase(self.phase_stats[name], method))
+        self.finish_wave = self.counted_finish_wave(self.finish_wave)
+        self.wave_start_counts = None
+        self.profiling = True
+
+    def disable_profiling(self):
+        for name in (*self.profiled_phases, 'finish_wave'):
+            self.__dict__.pop(name, None)
+        self.profiling = False
+
+    def timed_phase(self, phase, method):
+        perf_counter_ns = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                phase[0] += 1
+                phase[1] += perf_counter_ns() - start
+        return timed
+
+    def counted_start_wave(self, start_wave):
+        def counted():
+            if not self.game_started:
+                self.wave_start_counts = (self.enemy_count, self.enemies_alive, len(self.towers), self.current_wave)
+            return start_wave()
+        return counted
+
+    def counted_finish_wave(self, finish_wave):
+        def counted():
+            if self.wave_start_counts is None:  # Profiling started mid-wave
+                return finish_wave()
+            enemy_count, alive, towers, wave = self.wave_start_counts
+            self.wave_start_counts = None
+            # A cleared wave resets enemy_count, having spawned up to max_enemies.
+            if self.current_wave != wave:
+                spawned = max(self.max_enemies - enemy_count, 0)
+            else:
+                spawned = self.enemy_count - enemy_count
+            self.entity_stats['waves'] += 1
+            self.entity_stats['enemies_spawned'] += spawned
+            self.entity_stats['enemies_killed'] += alive + spawned - self.enemies_alive
+            self.entity_stats['towers_destroyed'] += towers - len(self.towers)
+            return finish_wave()
+        return counted
+
+    def reset_stats(self):
+        """Zeroes the profiling counters; profiling stays on or off as it was."""
+        if not hasattr(self, 'profiling'):
+            self.profiling = False
+        self.phase_stats = {name: [0, 0] for name in self.profiled_phases}
+        self.entity_stats = {'waves': 0, 'enemies_spawned': 0, 'enemies_killed': 0, 'towers_destroyed': 0}
+        if self.profiling:
+            self.disable_profiling()
+            self.enable_profiling()
+
+    def stats(self):
+        """Per-phase call counts and cumulative ns collected while profiling, plus the wave counters."""
+        return {
+            'profiling': self.profiling,
+            'phases': {name: {'calls': calls, 'ns': ns} for name, (calls, ns) in self.phase_stats.items()},
+            **self.entity_stats,
+        }
+
+    def end_wave(self, won):
+        """Handles the end of a wave, unlocking new towers and progressing to the next wave."""
+        if won:
+            if self.current_wave == 2:
+                self.available_towers.append(2)
+                self.touch('available_towers')
+            if self.current_wave == 3:
+                self.available_towers.append(3)
+                self.touch('available_towers')
+    def play_turn(self, action):
+        if action in ['UP', 'DOWN', 'LEFT', 'RIGHT']:
+            return self.move_cursor(action)
+        elif action == 'PLACE_TOWER':
+            return self.place_tower()
+        elif action == 'START_WAVE':
+            return self.start_wave()
+        return "Invalid action!", 0
+
+    def render(self, mode='human'):
+        print(
+            f"Player Position: {self.player_pos}, Coins: {self.coins}, Towers: {len(self.towers)}, Wave: {self.current_wave}")
+
+    def close(self):
+        pass
\ No newline at end of file
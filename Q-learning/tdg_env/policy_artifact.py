@@ -0,0 +1,145 @@
+import json
+import mmap
+import struct
+import zlib
+import numpy as np
+
+# A policy artifact (.tdp) is read in place through mmap, so every process serving the same
+# policy shares one page-cached copy, and loading one never unpickles anything:
+#
+#   prefix: magic, format version, header length, CRC32 of the header
+#   header: UTF-8 JSON with
+#       kind        'q_table', 'policy_table' or 'qnetwork'
+#       env         the layout the policy was trained on (see env_config)
+#       state_hash  how an observation picks a row: the flat observation values (one per
+#                   path into the observation dict) v give row sum((v - start) * stride)
+#       arrays      name -> dtype, shape, offset, byte count and CRC32 of each array
+#       meta        free-form notes (source file, ...)
+#   arrays: raw little-endian data, each starting on a 64-byte boundary
+MAGIC = b'TDPA'
+VERSION = 1
+prefix = struct.Struct('<4sHxxII')  # magic, version, header length, header CRC32
+ALIGN = 64
+
+
+def env_config(env):
+    """The parts of a TowerDefenseEnv a policy depends on."""
+    return {'rows': env.rows, 'cols': env.cols, 'path_row': env.path_row, 'max_waves': env.max_waves,
+            'actions': list(env.actions)}
+
+
+def linear_hash(paths, sizes, starts=None, strides=None):
+    """A state_hash header entry; strides default to row-major over sizes."""
+    starts = list(starts) if starts is not None else [0] * len(sizes)
+    if strides is None:
+        strides = [int(np.prod(sizes[i + 1:])) for i in range(len(sizes))]
+    return {'scheme': 'linear', 'paths': ['.'.join(map(str, path)) for path in paths],
+            'sizes': [int(size) for size in sizes], 'starts': [int(start) for start in starts],
+            'strides': [int(stride) for stride in strides]}
+
+
+# The tabular agent's hash() in dql.py and tdg_controller.py: x * 21 + y * 3 + selected tower.
+DQL_HASH = linear_hash([('current_position', 0), ('current_position', 1), ('current_selected_tower',)],
+                       sizes=[7, 7, 4], strides=[21, 3, 1])
+
+
+def write_artifact(path, kind, arrays, env=None, state_hash=None, meta=None):
+    """Writes arrays (name -> ndarray) as a policy artifact; env is a config dict from env_config()."""
+    entries = {}
+    offset = 0
+    blobs = []
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        array = array.astype(array.dtype.newbyteorder('<'), copy=False)
+        data = array.tobytes()
+        entries[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset,
+                         'nbytes': len(data), 'crc32': zlib.crc32(data)}
+        blobs.append(data)
+        offset += -(-len(data) // ALIGN) * ALIGN
+    header = {'kind': kind, 'env': env, 'state_hash': state_hash, 'arrays': entries, 'meta': meta or {}}
+
+    # Array offsets are relative to the data start, which follows the header rounded up to ALIGN.
+    header_bytes = json.dumps(header, sort_keys=True).encode()
+    data_start = -(-(prefix.size + len(header_bytes)) // ALIGN) * ALIGN
+    with open(path, 'wb') as f:
+        f.write(prefix.pack(MAGIC, VERSION, len(header_bytes), zlib.crc32(header_bytes)))
+        f.write(header_bytes)
+        for name, data in zip(entries, blobs):
+            f.seek(data_start + entries[name]['offset'])
+            f.write(data)
+        f.truncate(data_start + offset)
+
+
+class PolicyArtifact:
+    """
+    An artifact opened read-only through mmap: kind, env, state_hash and meta
+    come from the header, and arrays maps names to read-only arrays backed by
+    the mapping. With verify=True every array's CRC32 is checked on open,
+    which reads the whole file once.
+    """
+
+    def __init__(self, path, verify=True):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mmap) < prefix.size:
+            raise ValueError(f"{path} is not a policy artifact")
+        magic, version, header_length, header_crc = prefix.unpack_from(self.mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a policy artifact")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported policy artifact version {version}")
+        header_bytes = self.mmap[prefix.size:prefix.size + header_length]
+        if zlib.crc32(header_bytes) != header_crc:
+            raise ValueError(f"{path}: header checksum mismatch")
+        header = json.loads(header_bytes)
+        self.kind = header['kind']
+        self.env = header['env']
+        self.state_hash = header['state_hash']
+        self.meta = header['meta']
+
+        data_start = -(-(prefix.size + header_length) // ALIGN) * ALIGN
+        self.arrays = {}
+        for name, entry in header['arrays'].items():
+            start = data_start + entry['offset']
+            if start + entry['nbytes'] > len(self.mmap):
+                raise ValueError(f"{path}: array {name!r} is truncated")
+            if verify and zlib.crc32(memoryview(self.mmap)[start:start + entry['nbytes']]) != entry['crc32']:
+                raise ValueError(f"{path}: array {name!r} checksum mismatch")
+            dtype = np.dtype(entry['dtype'])
+            count = entry['nbytes'] // dtype.itemsize
+            self.arrays[name] = np.frombuffer(self.mmap, dtype, count, start).reshape(entry['shape'])
+
+        if self.state_hash is not None:
+            if self.state_hash['scheme'] != 'linear':
+                raise ValueError(f"{path}: unknown state hash scheme {self.state_hash['scheme']!r}")
+            self.paths = [tuple(int(key) if key.isdigit() else key for key in path.split('.'))
+                          for path in self.state_hash['paths']]
+
+    def check_env(self, env):
+        """Raises ValueError if env's layout differs from the one the policy was trained on."""
+        expected = env_config(env)
+        for key, value in (self.env or {}).items():
+            if key in expected and expected[key] != value:
+                raise ValueError(f"{self.path} was made for {key}={value!r}, the env has {expected[key]!r}")
+
+    def state_index(self, obs):
+        """The row for obs under the artifact's state_hash."""
+        index = 0
+        for path, size, start, stride in zip(self.paths, self.state_hash['sizes'],
+                                             self.state_hash['starts'], self.state_hash['strides']):
+            value = obs
+            for key in path:
+                value = value[key]
+            value -= start
+            if not 0 <= value < size:
+                raise ValueError(f"Observation {obs} is outside {self.path}'s state space")
+            index += value * stride
+        return index
+
+
+def load_artifact(path, kind=None, verify=True):
+    artifact = PolicyArtifact(path, verify)
+    if kind is not None and artifact.kind != kind:
+        raise ValueError(f"{path} holds a {artifact.kind}, not a {kind}")
+    return artifact
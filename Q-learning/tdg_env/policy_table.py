@@ -0,0 +1,96 @@
+import numpy as np
+from .policy_artifact import linear_hash, load_artifact, write_artifact
+
+
+def discrete_leaves(space, path=()):
+    """(path, Discrete) for every Discrete in a Dict / Tuple of Discretes, in observation order."""
+    from gym import spaces
+    if isinstance(space, spaces.Discrete):
+        return [(path, space)]
+    if isinstance(space, spaces.Dict):
+        return [leaf for key, sub in space.spaces.items() for leaf in discrete_leaves(sub, path + (key,))]
+    if isinstance(space, spaces.Tuple):
+        return [leaf for i, sub in enumerate(space.spaces) for leaf in discrete_leaves(sub, path + (i,))]
+    raise TypeError(f"Can only tabulate Dicts and Tuples of Discretes, not {space}")
+
+
+class PolicyTable:
+    """
+    A greedy policy tabulated over every observation of a Dict / Tuple of
+    Discretes: actions[i] is the argmax of q_values[i], where i is the
+    observation's row-major index over the Discretes' sizes. Reading one
+    needs only NumPy, and act() is a few list lookups.
+    """
+
+    def __init__(self, paths, sizes, starts, q_values, actions=None):
+        self.paths = [tuple(path) for path in paths]
+        self.sizes = [int(size) for size in sizes]
+        self.starts = [int(start) for start in starts]
+        self.q_values = np.asarray(q_values, dtype=np.float32)
+        if self.q_values.shape[0] != int(np.prod(self.sizes)):
+            raise ValueError(f"{self.q_values.shape[0]} rows of Q-values for {np.prod(self.sizes)} observations")
+        self.actions = (self.q_values.argmax(axis=1) if actions is None else np.asarray(actions)).tolist()
+        self.strides = [int(np.prod(self.sizes[i + 1:])) for i in range(len(self.sizes))]
+
+    def index(self, values):
+        """Row of the flat observation values (one per Discrete, in paths order)."""
+        i = 0
+        for value, start, size, stride in zip(values, self.starts, self.sizes, self.strides):
+            value -= start
+            if not 0 <= value < size:
+                raise ValueError(f"Observation values {values} are outside the table")
+            i += value * stride
+        return i
+
+    def flatten(self, obs):
+        values = []
+        for path in self.paths:
+            value = obs
+            for key in path:
+                value = value[key]
+            values.append(value)
+        return values
+
+    def act(self, obs):
+        return self.actions[self.index(self.flatten(obs))]
+
+    def act_values(self, values):
+        return self.actions[self.index(values)]
+
+    def save(self, path, env=None):
+        """Writes a policy artifact for .tdp paths (env: an env_config() dict), otherwise an .npz."""
+        actions = np.array(self.actions, dtype=np.min_scalar_type(self.q_values.shape[1] - 1))
+        if path.endswith('.tdp'):
+            write_artifact(path, 'policy_table', {'actions': actions, 'q_values': self.q_values}, env=env,
+                           state_hash=linear_hash(self.paths, self.sizes, self.starts))
+            return
+        # Paths are stored as dotted strings (tuple indices as digits) so loading never unpickles.
+        np.savez(path, paths=np.array(['.'.join(map(str, p)) for p in self.paths]),
+                 sizes=np.array(self.sizes), starts=np.array(self.starts),
+                 actions=actions, q_values=self.q_values)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a .tdp policy artifact (Q-values stay memory-mapped) or an .npz."""
+        if path.endswith('.tdp'):
+            artifact = load_artifact(path, 'policy_table')
+            state_hash = artifact.state_hash
+            return cls(artifact.paths, state_hash['sizes'], state_hash['starts'],
+                       artifact.arrays['q_values'], artifact.arrays['actions'])
+        with np.load(path, allow_pickle=False) as data:
+            paths = [tuple(int(key) if key.isdigit() else key for key in p.split('.')) for p in data['paths'].tolist()]
+            return cls(paths, data['sizes'], data['starts'], data['q_values'], data['actions'])
+
+
+def distill(q_function, observation_space):
+    """
+    Tabulates the greedy policy of q_function, which maps an (n, k) float32
+    array of flat observations (one column per Discrete of observation_space)
+    to (n, num_actions) Q-values, with a single call over every observation.
+    """
+    leaves = discrete_leaves(observation_space)
+    sizes = [leaf.n for _, leaf in leaves]
+    starts = [int(leaf.start) for _, leaf in leaves]
+    observations = np.indices(sizes).reshape(len(sizes), -1).T + starts
+    q_values = np.asarray(q_function(observations.astype(np.float32)), dtype=np.float32)
+    return PolicyTable([path for path, _ in leaves], sizes, starts, q_values)
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# The tests import the trainers and UI modules the way their scripts do, from their own directories.
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+for path in (ROOT, os.path.join(ROOT, 'train'), os.path.join(ROOT, 'UI')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
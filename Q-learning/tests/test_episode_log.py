@@ -0,0 +1,66 @@
+import random
+
+from episode_log import EpisodeRecorder, read_episodes
+from test_gym_train import TowerDefenseEnv
+
+
+def record_late_episode(path, burn_in_episodes=60, steps=200):
+    """Records one episode that starts after burn_in_episodes unrecorded ones on the same streams."""
+    env = TowerDefenseEnv(seed=3)
+    actions = random.Random(0)
+    for _ in range(burn_in_episodes):
+        env.reset()
+        for _ in range(steps):
+            if env.step(actions.randrange(env.action_space.n))[2]:
+                break
+    recorder = EpisodeRecorder(env, path, checkpoint_every=4)
+    recorder.reset()
+    for _ in range(steps):
+        if recorder.step(actions.randrange(env.action_space.n))[2]:
+            break
+    recorder.close()
+    return env
+
+
+class CountingGenerator:
+    """Forwards to generator, counting the draws taken through it."""
+
+    def __init__(self, generator):
+        self.generator = generator
+        self.draws = 0
+
+    def getrandbits(self, *args):
+        self.draws += 1
+        return self.generator.getrandbits(*args)
+
+    def random_sample(self, *args):
+        self.draws += 1
+        return self.generator.random_sample(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.generator, name)
+
+
+def test_late_checkpoint_loads_without_drawing(tmp_path):
+    path = str(tmp_path / 'episodes.tdel')
+    recorded = record_late_episode(path)
+    [episode] = read_episodes(path)
+    assert sum(recorded.rng.position()) > 1000  # Far into the streams, where replaying them would cost
+
+    env = TowerDefenseEnv(seed=episode.seed)
+    env.rng.random, env.rng.np_random = CountingGenerator(env.rng.random), CountingGenerator(env.rng.np_random)
+    last = len(episode.checkpoints) - 1
+    assert last > 0
+    episode.load_checkpoint(env, last)
+    assert env.rng.random.draws == env.rng.np_random.draws == 0
+    assert env.episode_state() + env.rng.flat_state() == episode.checkpoints[last]
+
+
+def test_env_at_matches_the_recording(tmp_path):
+    path = str(tmp_path / 'episodes.tdel')
+    recorded = record_late_episode(path)
+    [episode] = read_episodes(path)
+    episode.verify()
+    env = episode.env_at(len(episode))
+    assert env.episode_state() == recorded.episode_state()
+    assert env.rng.getstate() == recorded.rng.getstate()
@@ -0,0 +1,16 @@
+import pytest
+
+from policy_backends import POLICY_BACKENDS
+from tdg_controller import GameController
+
+
+@pytest.mark.parametrize('algo', sorted(POLICY_BACKENDS))
+def test_controller_steps_with_every_backend(algo):
+    controller = GameController(algo=algo)
+    try:
+        action = controller.choose_action()
+        assert 0 <= action < controller.env.action_space.n
+        assert action == controller.q_learning_step()  # Greedy: both ask the backend
+        controller.env.step(action)
+    finally:
+        controller.close()
@@ -0,0 +1,41 @@
+import numpy as np
+
+from dqn_test import PrioritizedReplayBuffer, ReplayBuffer
+
+
+def full_buffer(buffer_type, seed, size=1000):
+    buffer = buffer_type(size, seed=seed)
+    states = np.arange(size * 3, dtype=np.float32).reshape(size, 3)
+    buffer.add_batch(states, np.arange(size) % 6, np.arange(size, dtype=np.float32), states + 1,
+                     np.zeros(size, dtype=np.float32))
+    return buffer
+
+
+def test_seeded_samples_repeat():
+    first, second = full_buffer(ReplayBuffer, seed=7), full_buffer(ReplayBuffer, seed=7)
+    assert first.size() == first.max_size
+    for _ in range(5):
+        for a, b in zip(first.sample(64), second.sample(64)):
+            assert np.array_equal(a.numpy(), b.numpy())
+
+
+def test_sample_has_no_repeats_and_leaves_global_stream_alone():
+    buffer = full_buffer(ReplayBuffer, seed=0)
+    np.random.seed(0)
+    expected = np.random.rand()
+    np.random.seed(0)
+    _, _, rewards, _, _ = buffer.sample(64)
+    assert len(np.unique(rewards.numpy())) == 64
+    assert np.random.rand() == expected
+
+
+def test_different_seeds_differ():
+    rewards = [full_buffer(ReplayBuffer, seed).sample(64)[2].numpy() for seed in (1, 2)]
+    assert not np.array_equal(*rewards)
+
+
+def test_prioritized_samples_repeat():
+    first, second = full_buffer(PrioritizedReplayBuffer, seed=3), full_buffer(PrioritizedReplayBuffer, seed=3)
+    *_, idx_first = first.sample(64)
+    *_, idx_second = second.sample(64)
+    assert np.array_equal(idx_first, idx_second)
@@ -0,0 +1,262 @@
+import random
+import numpy as np
+from gym import spaces
+from test_gym_train import TowerDefenseEnv
+
+
+class BatchTowerDefenseEnv:
+    """
+    Runs num_envs copies of TowerDefenseEnv side by side in NumPy arrays.
+
+    Enemies only ever walk along path_row one cell per tick, so they are stored
+    per path column: enemy_type[i, x] is -1 for an empty cell, and x is the
+    enemy's position. Every game owns a random.Random / np.random.RandomState
+    pair seeded with seed + i, and draws from it in exactly the same order as
+    the scalar env draws from its EnvRandom, so game i replays
+    TowerDefenseEnv(seed=seed + i) action for action.
+    """
+
+    def __init__(self, num_envs, seed=None):
+        # The scalar env is only used as the source of the game config.
+        template = TowerDefenseEnv(seed=0)
+
+        self.num_envs = num_envs
+        self.rows, self.cols = template.rows, template.cols
+        self.path_row = template.path_row
+        self.max_waves = template.max_waves
+        self.max_enemies = template.max_enemies
+        self.start_coins = template.coins
+        self.tower_info = template.tower_info
+        self.enemy_info = template.enemy_info
+        self.rewards = template.rewards
+        self.actions = template.actions
+
+        self.single_action_space = template.action_space
+        self.single_observation_space = template.observation_space
+        self.action_space = spaces.MultiDiscrete([len(self.actions)] * num_envs)
+
+        num_types = len(self.tower_info) + 1
+        self.tower_cost = np.zeros(num_types, dtype=np.int64)
+        self.tower_health_max = np.zeros(num_types, dtype=np.int32)
+        for t, info in self.tower_info.items():
+            self.tower_cost[t] = info['cost']
+            self.tower_health_max[t] = info['health']
+        self.enemy_health_max = np.array([self.enemy_info[e]['health'] for e in sorted(self.enemy_info)],
+                                         dtype=np.int32)
+
+        # Distance from every grid cell to every path column, and from it the
+        # damage each tower type deals to a path column / takes from an enemy
+        # type standing there.
+        cell_rows, cell_cols = np.divmod(np.arange(self.rows * self.cols), self.cols)
+        distance = (np.abs(cell_rows - self.path_row)[:, None] +
+                    np.abs(cell_cols[:, None] - np.arange(self.cols)[None, :]))
+        # Kept as float64 so the products run through BLAS; every sum is a
+        # small integer and therefore exact.
+        self.tower_hits = {t: (distance <= info['range']) * float(info['damage'])
+                           for t, info in self.tower_info.items()}
+        self.enemy_hits = {e: (distance.T <= info['range']) * float(info['damage'])
+                           for e, info in self.enemy_info.items()}
+
+        # In-bounds neighbours of every cell, in move_cursor_to_random_adjacent's order.
+        self.adjacent = []
+        for x in range(self.rows):
+            for y in range(self.cols):
+                directions = [(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]
+                self.adjacent.append([
+                    pos for pos in directions
+                    if 0 <= pos[0] < self.rows and 0 <= pos[1] < self.cols
+                ])
+
+        if seed is None:
+            seed = random.randrange(2 ** 31)
+        self.seed = seed
+        self.rngs = [random.Random(seed + i) for i in range(num_envs)]
+        self.np_rngs = [np.random.RandomState(seed + i) for i in range(num_envs)]
+
+        n = num_envs
+        self.tower_type = np.zeros((n, self.rows * self.cols), dtype=np.int8)
+        self.tower_health = np.zeros((n, self.rows * self.cols), dtype=np.int32)
+        self.enemy_type = np.full((n, self.cols), -1, dtype=np.int8)
+        self.enemy_health = np.zeros((n, self.cols), dtype=np.int32)
+        self.player_pos = np.zeros((n, 2), dtype=np.int64)
+        self.selected_tower = np.ones(n, dtype=np.int64)
+        self.num_available = np.ones(n, dtype=np.int64)
+        self.current_wave = np.ones(n, dtype=np.int64)
+        self.coins = np.zeros(n, dtype=np.int64)
+        self.enemy_count = np.zeros(n, dtype=np.int64)
+        self.wave_ready = np.zeros(n, dtype=bool)
+        self.game_over = np.zeros(n, dtype=bool)
+
+        self.reset()
+
+    def reset(self):
+        self._reset_games(np.arange(self.num_envs))
+        return self.get_observation(), np.zeros(self.num_envs), np.zeros(self.num_envs, dtype=bool), {}
+
+    def _reset_games(self, idx):
+        self.tower_type[idx] = 0
+        self.tower_health[idx] = 0
+        self.enemy_type[idx] = -1
+        self.enemy_health[idx] = 0
+        self.selected_tower[idx] = 1
+        self.num_available[idx] = 1
+        self.current_wave[idx] = 1
+        self.coins[idx] = self.start_coins
+        self.enemy_count[idx] = 0
+        self.wave_ready[idx] = False
+        self.game_over[idx] = False
+        for i in idx.tolist():
+            rng = self.rngs[i]
+            self.player_pos[i] = (rng.randint(0, self.rows - 1), rng.randint(0, self.cols - 1))
+
+    def get_observation(self):
+        return {
+            'current_position': self.player_pos.copy(),
+            'current_selected_tower': self.selected_tower.copy()
+        }
+
+    def is_done(self):
+        return self.game_over | (self.current_wave > self.max_waves)
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64)
+        rewards = np.zeros(self.num_envs)
+
+        # UP / DOWN / LEFT / RIGHT
+        moving = actions < 4
+        if moving.any():
+            deltas = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)])
+            target = self.player_pos + deltas[np.where(moving, actions, 0)]
+            inside = ((target >= 0) & (target < (self.rows, self.cols))).all(axis=1)
+            self.player_pos[moving & inside] = target[moving & inside]
+            rewards[moving & ~inside] = -1
+
+        wave_games = actions == 5
+        placing = np.flatnonzero(actions == 4)
+        if placing.size:
+            wave_games |= self._place_towers(placing, rewards)
+
+        if wave_games.any():
+            self._start_waves(np.flatnonzero(wave_games), rewards)
+
+        start_wave = actions == 5
+        rewards[start_wave & ~self.wave_ready] -= 500
+        self.wave_ready[start_wave] = False
+
+        dones = self.is_done()
+        info = {}
+        if dones.any():
+            info['final_observation'] = self.get_observation()
+            info['final_wave'] = self.current_wave.copy()
+            self._reset_games(np.flatnonzero(dones))
+
+        return self.get_observation(), rewards, dones, info
+
+    def _place_towers(self, idx, rewards):
+        """PLACE_TOWER for the games in idx; returns the mask of games that ran out of coins and start a wave."""
+        np_rngs = self.np_rngs
+        switch = np.array([np_rngs[i].rand() < 0.5 for i in idx.tolist()]) & (self.current_wave[idx] > 1)
+        switched = idx[switch]
+        self.selected_tower[switched] = self.selected_tower[switched] % self.num_available[switched] + 1
+
+        cell = self.player_pos[idx, 0] * self.cols + self.player_pos[idx, 1]
+        occupied = self.tower_type[idx, cell] > 0
+        on_path = self.player_pos[idx, 0] == self.path_row
+        cost = self.tower_cost[self.selected_tower[idx]]
+        broke = ~occupied & ~on_path & (self.coins[idx] < cost)
+        placed = ~occupied & ~on_path & ~broke
+
+        games = idx[placed]
+        self.wave_ready[games] = True
+        self.coins[games] -= cost[placed]
+        self.tower_type[games, cell[placed]] = self.selected_tower[games]
+        self.tower_health[games, cell[placed]] = self.tower_health_max[self.selected_tower[games]]
+        rewards[games] = self.rewards['tower_placed_success']
+
+        self._move_to_random_adjacent(idx[~broke])
+
+        out_of_coins = np.zeros(self.num_envs, dtype=bool)
+        out_of_coins[idx[broke]] = True
+        return out_of_coins
+
+    def _move_to_random_adjacent(self, idx):
+        if not idx.size:
+            return
+        cells = (self.player_pos[idx, 0] * self.cols + self.player_pos[idx, 1]).tolist()
+        rngs, adjacent = self.rngs, self.adjacent
+        self.player_pos[idx] = [rngs[i].choice(adjacent[cell]) for i, cell in zip(idx.tolist(), cells)]
+
+    def _start_waves(self, idx, rewards):
+        start_wave = self.current_wave[idx].copy()
+        active = idx
+        while active.size:
+            active = self._tick(active)
+        self._move_to_random_adjacent(idx)
+
+        won = ~self.game_over[idx]
+        wave = self.current_wave[idx]
+        self.num_available[idx[won]] = np.minimum(np.maximum(self.num_available[idx[won]], wave[won]),
+                                                  len(self.tower_info))
+
+        wave_rewards = np.full(idx.size, float(self.rewards['wave_lost']))
+        wave_rewards[won & (wave == start_wave + 1)] = self.rewards['wave_won']
+        wave_rewards[won & (wave > self.max_waves)] = self.rewards['game_won']
+        rewards[idx] = wave_rewards
+
+    def _tick(self, idx):
+        """One update_enemies() for the games in idx; returns the games whose wave is still running."""
+        idx = idx[~(~self.game_over[idx] & (self.current_wave[idx] > self.max_waves))]
+
+        leaked = self.enemy_type[idx, 0] >= 0
+        self.game_over[idx[leaked]] = True
+        idx = idx[~leaked]
+        if not idx.size:
+            return idx
+
+        spawning = idx[self.enemy_count[idx] < self.max_enemies]
+        rngs, num_enemy_types = self.rngs, len(self.enemy_info)
+        spawn_types = np.array([rngs[i].randint(1, num_enemy_types) - 1 for i in spawning.tolist()],
+                               dtype=np.int8)
+        spawn_types[self.current_wave[spawning] == 1] = 0
+
+        self._resolve_combat(idx)
+
+        self.enemy_type[idx, :-1] = self.enemy_type[idx, 1:]
+        self.enemy_health[idx, :-1] = self.enemy_health[idx, 1:]
+        self.enemy_type[idx, -1] = -1
+        self.enemy_health[idx, -1] = 0
+        if spawning.size:
+            self.enemy_type[spawning, -1] = spawn_types
+            self.enemy_health[spawning, -1] = self.enemy_health_max[spawn_types]
+            self.enemy_count[spawning] += 1
+
+        cleared = (self.enemy_count[idx] >= self.max_enemies) & (self.enemy_type[idx] < 0).all(axis=1)
+        finished = idx[cleared]
+        self.current_wave[finished] += 1
+        self.enemy_count[finished] = 0
+        self.coins[finished] += self.current_wave[finished] * 15
+        return idx[~cleared]
+
+    def _resolve_combat(self, idx):
+        tower_type = self.tower_type[idx]
+        enemy_type = self.enemy_type[idx]
+
+        enemy_damage = sum((tower_type == t) @ hits for t, hits in self.tower_hits.items()).astype(np.int32)
+        tower_damage = sum((enemy_type == e) @ hits for e, hits in self.enemy_hits.items()).astype(np.int32)
+
+        enemy_health = self.enemy_health[idx] - enemy_damage
+        dead = (enemy_type >= 0) & (enemy_health <= 0)
+        enemy_type[dead] = -1
+        enemy_health[enemy_type < 0] = 0
+        self.enemy_type[idx] = enemy_type
+        self.enemy_health[idx] = enemy_health
+
+        tower_health = self.tower_health[idx] - tower_damage
+        destroyed = (tower_type > 0) & (tower_health <= 0)
+        tower_type[destroyed] = 0
+        tower_health[tower_type == 0] = 0
+        self.tower_type[idx] = tower_type
+        self.tower_health[idx] = tower_health
+
+    def close(self):
+        pass
@@ -0,0 +1,36 @@
+import sys
+import time
+import contextlib
+import io
+import random
+import numpy as np
+import torch
+import dqn_test
+
+
+def samples_per_second(train, steps, seed=0):
+    """Runs train(max_steps=steps, seed=seed) from a fresh epsilon and returns env transitions per second."""
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    dqn_test.epsilon = 1.0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # Drop the per-episode progress lines
+        train(max_steps=steps, seed=seed)
+    return steps / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    env_counts = [int(n) for n in sys.argv[2:]] or [4, 16, 64]
+
+    # dqn() updates once per transition on batch_size samples; dqn_batched() once per K
+    # transitions on batch_size * K samples, so both replay each transition equally often.
+    batch = dqn_test.batch_size
+    base = samples_per_second(dqn_test.dqn, steps)
+    print(f"{'dqn':>16}: {base:,.0f} samples/sec, 1 update of {batch} per transition")
+    for n in env_counts:
+        dqn_test.num_envs = n
+        rate = samples_per_second(dqn_test.dqn_batched, steps)
+        print(f"{f'dqn_batched K={n}':>16}: {rate:,.0f} samples/sec ({rate / base:.1f}x), "
+              f"1 update of {batch * n} per {n} transitions")
@@ -0,0 +1,37 @@
+import sys
+import time
+from test_gym_train import TowerDefenseEnv
+
+# Tower layouts the waves are played against: cell -> tower type.
+LAYOUTS = {
+    'no towers': {},
+    'two towers': {(2, 5): 1, (4, 1): 2},
+    'full grid': {(row, col): 1 + (row + col) % 3 for row in range(7) for col in range(7) if row != 3},
+}
+
+
+def ticks_per_second(layout, duration=2.0, seed=0):
+    """
+    Plays waves against a fixed tower layout, calling update_enemies() until each
+    one ends; only the update_enemies() calls are timed, not the per-wave setup.
+    """
+    env = TowerDefenseEnv(seed=seed)
+    ticks = 0
+    elapsed = 0.0
+    while elapsed < duration:
+        env.reset()
+        env.current_wave = 2  # Mixed enemy types
+        env.towers = {pos: {'type': t, 'health': env.tower_info[t]['health']} for pos, t in layout.items()}
+        env.game_started = True
+        start = time.perf_counter()
+        while env.game_started:
+            env.update_enemies()
+            ticks += 1
+        elapsed += time.perf_counter() - start
+    return ticks / elapsed
+
+
+if __name__ == '__main__':
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    for name, layout in LAYOUTS.items():
+        print(f"{name:>12}: {ticks_per_second(layout, duration):,.0f} ticks/sec")
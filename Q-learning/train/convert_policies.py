@@ -0,0 +1,59 @@
+import sys
+import glob
+import pickle
+import numpy as np
+from test_gym_train import TowerDefenseEnv
+from tdg_env.policy_artifact import DQL_HASH, env_config, linear_hash, load_artifact, write_artifact
+from tdg_env.policy_table import PolicyTable
+
+
+def convert_q_table(path):
+    """A Q_table_*.pickle (dict of arrays) or .npy Q-table, keeping its dtype so greedy actions cannot change."""
+    if path.endswith('.npy'):
+        q_values = np.load(path)
+    else:
+        with open(path, 'rb') as f:
+            table = pickle.load(f)
+        q_values = np.array([table[i] for i in range(len(table))]) if isinstance(table, dict) else np.asarray(table)
+    return 'q_table', {'q_values': q_values}, DQL_HASH
+
+
+def convert_qnetwork(path):
+    """A QNetwork state dict saved with torch.save."""
+    import torch
+    state_dict = torch.load(path, map_location='cpu')
+    return 'qnetwork', {name: tensor.numpy() for name, tensor in state_dict.items()}, None
+
+
+def convert_policy_table(path):
+    """An .npz PolicyTable from dqn_test.distill_model()."""
+    table = PolicyTable.load(path)
+    arrays = {'actions': np.array(table.actions, dtype=np.uint8), 'q_values': table.q_values}
+    return 'policy_table', arrays, linear_hash(table.paths, table.sizes, table.starts)
+
+
+def convert(path, env):
+    """Writes the policy at path next to it as a .tdp artifact, reads it back and checks every array."""
+    out_path = path.rsplit('.', 1)[0] + '.tdp'
+    if path.endswith('.pth'):
+        kind, arrays, state_hash = convert_qnetwork(path)
+    elif path.endswith('.npz'):
+        kind, arrays, state_hash = convert_policy_table(path)
+    else:
+        kind, arrays, state_hash = convert_q_table(path)
+    write_artifact(out_path, kind, arrays, env=env_config(env), state_hash=state_hash, meta={'source': path})
+
+    artifact = load_artifact(out_path, kind)
+    for name, array in arrays.items():
+        if not np.array_equal(artifact.arrays[name], array):
+            raise AssertionError(f"{out_path}: {name} does not round-trip")
+    print(f"{path} -> {out_path} ({kind}: {', '.join(f'{n} {a.shape}' for n, a in artifact.arrays.items())})")
+    return out_path
+
+
+if __name__ == '__main__':
+    # Converts every trained policy in the current directory unless paths are given.
+    paths = sys.argv[1:] or sorted(glob.glob('Q_table_*.pickle') + glob.glob('*.pth') + glob.glob('*.npz'))
+    env = TowerDefenseEnv()
+    for path in paths:
+        convert(path, env)
@@ -1,6 +1,15 @@
+import os
+import sys
 import pickle
+import time
+import multiprocessing
 import numpy as np
-from test_gym_train import TowerDefenseEnv
+
+# The env lives in the Q-learning/tdg_env package, one directory up; set the path here so
+# the script also imports as train.dql.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tdg_env import TowerDefenseEnv
+from tdg_env.policy_artifact import DQL_HASH, env_config, load_artifact, write_artifact
 
 env = TowerDefenseEnv()
 def hash(obs):
@@ -9,9 +18,34 @@ def hash(obs):
 
     return x * (7 * 3) + y * 3 + h
 
+def num_states(env):
+	"""Number of rows hash() can index: every (x, y, selected tower) plus one, since towers start at 1."""
+	position, tower = env.observation_space['current_position'], env.observation_space['current_selected_tower']
+	return position[0].n * position[1].n * (tower.n - 1) + 1
+
+def new_q_table(env):
+	"""Zeroed (num_states, num_actions) Q-value and visit-count arrays."""
+	shape = (num_states(env), env.action_space.n)
+	return np.zeros(shape, dtype=np.float32), np.zeros(shape, dtype=np.int32)
+
+def load_q_table(path):
+	"""Loads a Q-table, memory-mapping .tdp and .npy files and converting the old dict-of-arrays pickles."""
+	if path.endswith('.tdp'):
+		return load_artifact(path, 'q_table').arrays['q_values']
+	if path.endswith('.npy'):
+		return np.load(path, mmap_mode='r')
+	with open(path, 'rb') as f:
+		Q_table = pickle.load(f)
+	if isinstance(Q_table, dict):
+		Q_table = np.array([Q_table[i] for i in range(len(Q_table))], dtype=np.float32)
+	return Q_table
+
+def save_q_table(path, Q_table, env):
+	"""Saves Q_table as a memory-mappable policy artifact, rows indexed by hash()."""
+	write_artifact(path, 'q_table', {'q_values': Q_table}, env=env_config(env), state_hash=DQL_HASH)
+
 def Q_learning(num_episodes=10000, gamma=0.9, epsilon=1, decay_rate=0.999):
-	Q_table = {i: np.zeros(len(env.actions)) for i in range(148)}
-	no_of_updates = {i: np.zeros(len(env.actions)) for i in range(148)}
+	Q_table, no_of_updates = new_q_table(env)
 	temp_dict = {
 		1: 0,
 		2: 0,
@@ -31,24 +65,114 @@ def Q_learning(num_episodes=10000, gamma=0.9, epsilon=1, decay_rate=0.999):
 				action = env.action_space.sample()
 			else:
 				action = np.argmax(Q_table[state])
-			eta = 1/(1 + no_of_updates[state][action])
+			eta = 1/(1 + no_of_updates[state, action])
 			next_obs, reward, done, info = env.step(action)
 			next_state = hash(next_obs)
-			Q_table[state][action] = ((1 - eta) * Q_table[state][action] + eta * (reward + (gamma * np.max(Q_table[next_state]))))
-			no_of_updates[state][action] += 1
+			Q_table[state, action] = ((1 - eta) * Q_table[state, action] + eta * (reward + (gamma * Q_table[next_state].max())))
+			no_of_updates[state, action] += 1
 			state = next_state
 		temp_dict[env.current_wave] += 1
 		epsilon *= decay_rate
 	return Q_table
 
-decay_rate = 0.99999993
+def run_episodes(args):
+	"""
+	Rollout worker for parallel_Q_learning: plays a chunk of episodes against its
+	own env, starting from the learner's Q_table, and returns the per-entry sum of
+	its TD targets plus how many times it updated each entry.
+	"""
+	chunk_seed, Q_array, updates_array, first_episode, num_episodes, gamma, epsilon, decay_rate = args
+	np.random.seed(chunk_seed)  # Exploration draws; the env has its own streams
+	worker_env = TowerDefenseEnv(seed=chunk_seed)
+
+	Q_table = Q_array.copy()
+	no_of_updates = updates_array.copy()
+	waves = np.zeros(worker_env.max_waves + 2, dtype=np.int64)
+	epsilon *= decay_rate ** first_episode
+	start = time.perf_counter()
+	for episode in range(num_episodes):
+		obs, reward, done, info = worker_env.reset()
+		state = hash(obs)
+		while not done:
+			if np.random.rand() < epsilon:
+				action = worker_env.action_space.sample()
+			else:
+				action = np.argmax(Q_table[state])
+			eta = 1/(1 + no_of_updates[state, action])
+			next_obs, reward, done, info = worker_env.step(action)
+			next_state = hash(next_obs)
+			Q_table[state, action] = ((1 - eta) * Q_table[state, action] + eta * (reward + (gamma * Q_table[next_state].max())))
+			no_of_updates[state, action] += 1
+			state = next_state
+		waves[worker_env.current_wave] += 1
+		epsilon *= decay_rate
+	elapsed = time.perf_counter() - start
+
+	# With eta = 1/(1 + n) every Q entry is the running mean of its targets, so
+	# (n0 + k) * Q - n0 * Q0 is the sum of the k targets this worker added.
+	visits = no_of_updates - updates_array
+	target_sums = no_of_updates * Q_table.astype(np.float64) - updates_array * Q_array.astype(np.float64)
+	return target_sums, visits, waves, elapsed
+
+def parallel_Q_learning(num_episodes=10000, gamma=0.9, epsilon=1, decay_rate=0.999, num_workers=None,
+						sync_every=2000, seed=0):
+	"""
+	Q_learning with a pool of rollout workers. Every round each worker plays
+	sync_every episodes from a copy of the current Q_table, and the learner merges
+	the target sums and visit counts they send back, which is the exact serial
+	update for entries touched by a single worker. Chunks are seeded from
+	(seed, chunk index), so a run is reproducible for a given num_workers.
+	"""
+	num_workers = num_workers or multiprocessing.cpu_count()
+	Q_array, updates_array = new_q_table(env)
+	temp_dict = {wave: 0 for wave in range(1, env.max_waves + 2)}
+
+	start = time.perf_counter()
+	busy = 0.0
+	episode = 0
+	chunk = 0
+	with multiprocessing.Pool(num_workers) as pool:
+		while episode < num_episodes:
+			tasks = []
+			for worker in range(num_workers):
+				count = min(sync_every, num_episodes - episode)
+				if count <= 0:
+					break
+				tasks.append((seed * 1000003 + chunk, Q_array, updates_array, episode, count, gamma, epsilon, decay_rate))
+				episode += count
+				chunk += 1
+			results = pool.map(run_episodes, tasks)
+
+			target_sums = updates_array * Q_array.astype(np.float64)
+			for worker_sums, visits, waves, elapsed in results:
+				target_sums += worker_sums
+				updates_array = updates_array + visits
+				for wave in temp_dict:
+					temp_dict[wave] += int(waves[wave])
+				busy += elapsed
+			Q_array = np.divide(target_sums, updates_array, out=Q_array.astype(np.float64),
+								where=updates_array > 0).astype(np.float32)
+
+			wall = time.perf_counter() - start
+			print(f"episode number {episode}: {episode / wall:.0f} episodes/sec, "
+				  f"{episode / wall / num_workers:.0f} per core ({episode / busy:.0f} per busy core)")
+			print(temp_dict)
+
+	return Q_array
+
+if __name__ == '__main__':
+    decay_rate = 0.99999993
+    num_workers = 1  # Set above 1 to train with parallel rollout workers
 
-Q_table = Q_learning(num_episodes=1000000, gamma=0.9, epsilon=1, decay_rate=decay_rate) # Run Q-learning
+    if num_workers > 1:
+        Q_table = parallel_Q_learning(num_episodes=1000000, gamma=0.9, epsilon=1, decay_rate=decay_rate,
+                                      num_workers=num_workers)
+    else:
+        Q_table = Q_learning(num_episodes=1000000, gamma=0.9, epsilon=1, decay_rate=decay_rate) # Run Q-learning
 
-with open('Q_table.pickle', 'wb') as handle:
-    pickle.dump(Q_table, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    save_q_table('Q_table.tdp', Q_table, env)
 
-# Q_table = np.load('Q_table.pickle', allow_pickle=True)
+# Q_table = load_q_table('Q_table.tdp')
 #
 # obs, reward, done, info = env.reset()
 # print(obs, reward, done, info)
@@ -2,9 +2,10 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 import numpy as np
-import random
-from collections import deque
 from test_gym_train import TowerDefenseEnv
+from batch_env import BatchTowerDefenseEnv
+from tdg_env.policy_table import PolicyTable, distill
+from tdg_env.policy_artifact import env_config, write_artifact
 
 # Hyperparameters
 gamma = 0.9
@@ -16,6 +17,12 @@ learning_rate = 0.0005
 num_episodes = 10000
 target_update_freq = 500  # Frequency of target network update
 max_memory = 10000  # Max size of experience replay buffer
+num_envs = 16  # Games stepped together by dqn_batched()
+prioritized_replay = False  # Sample transitions in proportion to their TD error
+per_alpha = 0.6  # How strongly priorities skew sampling (0 = uniform)
+per_beta = 0.4  # Importance-sampling correction at the start, annealed to 1 over num_episodes
+per_epsilon = 1e-3  # Keeps zero-error transitions sampleable
+first_win_episode = None  # Set by the training loops the first time a game is won
 
 # Neural Network for Q-value approximation
 class QNetwork(nn.Module):
@@ -30,24 +37,123 @@ class QNetwork(nn.Module):
         x = torch.relu(self.dense2(x))
         return self.q_values(x)
 
-# Experience Replay Buffer
+# Experience Replay Buffer: fixed-capacity ring of NumPy arrays, one per field, so memory is
+# allocated once up front and add / add_batch are O(1) per transition. Batches are drawn from
+# the buffer's own generator, so a seeded run samples the same transitions every time.
 class ReplayBuffer:
-    def __init__(self, max_size):
-        self.buffer = deque(maxlen=max_size)
+    def __init__(self, max_size, state_size=3, seed=None):
+        self.max_size = max_size
+        self.rng = np.random.default_rng(seed)
+        self.states = np.zeros((max_size, state_size), dtype=np.float32)
+        self.actions = np.zeros(max_size, dtype=np.int64)
+        self.rewards = np.zeros(max_size, dtype=np.float32)
+        self.next_states = np.zeros((max_size, state_size), dtype=np.float32)
+        self.dones = np.zeros(max_size, dtype=np.float32)
+        self.pos = 0
+        self.count = 0
 
     def add(self, experience):
-        self.buffer.append(experience)
+        state, action, reward, next_state, done = experience
+        pos = self.pos
+        self.states[pos] = state
+        self.actions[pos] = action
+        self.rewards[pos] = reward
+        self.next_states[pos] = next_state
+        self.dones[pos] = done
+        self.pos = (pos + 1) % self.max_size
+        self.count = min(self.count + 1, self.max_size)
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        idx = (self.pos + np.arange(len(actions))) % self.max_size
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+        self.pos = (self.pos + len(actions)) % self.max_size
+        self.count = min(self.count + len(actions), self.max_size)
 
     def sample(self, batch_size):
-        return random.sample(self.buffer, batch_size)
+        """Returns (states, actions, rewards, next_states, dones) tensors sharing memory with the gathered rows."""
+        # No transition twice in a batch; Generator.choice draws the indices without permuting the whole buffer
+        idx = self.rng.choice(self.count, batch_size, replace=False)
+        return tuple(torch.from_numpy(field[idx]) for field in
+                     (self.states, self.actions, self.rewards, self.next_states, self.dones))
 
     def size(self):
-        return len(self.buffer)
+        return self.count
+
+# Binary tree over the priorities stored in its leaves, where every node holds the sum of
+# its children: sampling proportional to priority and priority updates are both O(log n).
+class SumTree:
+    def __init__(self, capacity):
+        self.leaf_count = 1
+        while self.leaf_count < capacity:
+            self.leaf_count *= 2
+        self.depth = self.leaf_count.bit_length() - 1
+        self.nodes = np.zeros(2 * self.leaf_count - 1)
+
+    def total(self):
+        return self.nodes[0]
+
+    def update(self, idx, priorities):
+        nodes = np.asarray(idx) + self.leaf_count - 1
+        self.nodes[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique((nodes - 1) // 2)
+            self.nodes[nodes] = self.nodes[2 * nodes + 1] + self.nodes[2 * nodes + 2]
+
+    def find(self, values):
+        """Leaf index of the prefix-sum interval every value falls in."""
+        nodes = np.zeros(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes + 1
+            go_right = values > self.nodes[left]
+            values = np.where(go_right, values - self.nodes[left], values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - (self.leaf_count - 1)
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    def __init__(self, max_size, state_size=3, alpha=0.6, epsilon=1e-3, seed=None):
+        super().__init__(max_size, state_size, seed)
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.tree = SumTree(max_size)
+        self.max_priority = 1.0
+
+    def add(self, experience):
+        pos = self.pos
+        super().add(experience)
+        self.tree.update([pos], self.max_priority)
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        idx = (self.pos + np.arange(len(actions))) % self.max_size
+        super().add_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(idx, self.max_priority)
+
+    def sample(self, batch_size, beta=0.4):
+        """
+        Stratified proportional sample: returns the usual five tensors plus the
+        importance-sampling weights (normalised to a max of 1) and the buffer
+        indices to pass back to update_priorities.
+        """
+        total = self.tree.total()
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+        idx = np.minimum(self.tree.find(values), self.count - 1)
+        probabilities = self.tree.nodes[idx + self.tree.leaf_count - 1] / total
+        weights = (self.count * probabilities) ** -beta
+        weights /= weights.max()
+        batch = tuple(torch.from_numpy(field[idx]) for field in
+                      (self.states, self.actions, self.rewards, self.next_states, self.dones))
+        return batch + (torch.from_numpy(weights.astype(np.float32)), idx)
+
+    def update_priorities(self, idx, td_errors):
+        priorities = (np.abs(td_errors) + self.epsilon) ** self.alpha
+        self.tree.update(idx, priorities)
+        self.max_priority = max(self.max_priority, priorities.max())
 
 # Train the model
 def train_step(model, target_model, batch, optimizer):
-    global gamma
-
     states, actions, rewards, next_states, dones = zip(*batch)
 
     states = torch.tensor(np.array(states), dtype=torch.float32)
@@ -55,6 +161,10 @@ def train_step(model, target_model, batch, optimizer):
     rewards = torch.tensor(rewards, dtype=torch.float32)
     next_states = torch.tensor(np.array(next_states), dtype=torch.float32)
     dones = torch.tensor(dones, dtype=torch.float32)
+    return train_batch(model, target_model, states, actions, rewards, next_states, dones, optimizer)
+
+def q_targets(model, target_model, states, actions, rewards, next_states, dones):
+    global gamma
 
     # Predict Q-values for current states and next states
     q_values = model(states)
@@ -69,7 +179,11 @@ def train_step(model, target_model, batch, optimizer):
         max_next_q_values = next_q_values.max(1)[0]
         target_q_values = rewards + gamma * (1 - dones) * max_next_q_values
 
-    loss = nn.MSELoss()(q_values_taken.squeeze(), target_q_values)
+    return q_values_taken.squeeze(1), target_q_values
+
+def train_batch(model, target_model, states, actions, rewards, next_states, dones, optimizer):
+    q_values_taken, target_q_values = q_targets(model, target_model, states, actions, rewards, next_states, dones)
+    loss = nn.MSELoss()(q_values_taken, target_q_values)
 
     # Update the model
     optimizer.zero_grad()
@@ -77,8 +191,32 @@ def train_step(model, target_model, batch, optimizer):
     optimizer.step()
     return loss.item()
 
+# Prioritized variant: importance-weighted squared TD error, then the sampled priorities are refreshed
+def train_prioritized(model, target_model, replay_buffer, optimizer, beta, size):
+    *batch, weights, idx = replay_buffer.sample(size, beta)
+    q_values_taken, target_q_values = q_targets(model, target_model, *batch)
+    td_errors = target_q_values - q_values_taken
+    loss = (weights * td_errors ** 2).mean()
+
+    optimizer.zero_grad()
+    loss.backward()
+    optimizer.step()
+    replay_buffer.update_priorities(idx, td_errors.detach().numpy())
+    return loss.item()
+
+def new_replay_buffer(seed=None):
+    if prioritized_replay:
+        return PrioritizedReplayBuffer(max_memory, alpha=per_alpha, epsilon=per_epsilon, seed=seed)
+    return ReplayBuffer(max_memory, seed=seed)
+
+def replay_step(model, target_model, replay_buffer, optimizer, episode, size):
+    if prioritized_replay:
+        beta = per_beta + (1 - per_beta) * min(episode / num_episodes, 1)
+        return train_prioritized(model, target_model, replay_buffer, optimizer, beta, size)
+    return train_batch(model, target_model, *replay_buffer.sample(size), optimizer)
+
 # Main training loop
-def dqn():
+def dqn(max_steps=None, seed=None):
     global epsilon
     global epsilon_decay
     global min_epsilon
@@ -87,6 +225,7 @@ def dqn():
     global num_episodes
     global target_update_freq
     global max_memory
+    global first_win_episode
 
     print('Hyperparameters:')
     print(f"Epsilon: {epsilon}")
@@ -97,9 +236,10 @@ def dqn():
     print(f"Number of Episodes: {num_episodes}")
     print(f"Target Update Frequency: {target_update_freq}")
     print(f"Max Memory: {max_memory}")
+    print(f"Prioritized Replay: {prioritized_replay}")
     print("Starting DQN training...")
     
-    env = TowerDefenseEnv()
+    env = TowerDefenseEnv(seed=seed)
 
     # Initialize the Q-network and target Q-network
     action_space = env.action_space.n
@@ -110,14 +250,17 @@ def dqn():
     optimizer = optim.Adam(model.parameters(), lr=learning_rate)
 
     # Initialize replay buffer
-    replay_buffer = ReplayBuffer(max_memory)
+    replay_buffer = new_replay_buffer(seed)
 
     # Initialize the target network
     target_model.load_state_dict(model.state_dict())
 
     total_rewards = []
+    steps = 0
 
     for episode in range(num_episodes):
+        if max_steps is not None and steps >= max_steps:
+            break
         if episode % 100 == 0:
             print(f"Episode {episode} - DONE")
         obs, reward, done, info = env.reset()
@@ -144,17 +287,20 @@ def dqn():
 
             # Sample a batch of experiences from the replay buffer
             if replay_buffer.size() > batch_size:
-                batch = replay_buffer.sample(batch_size)
-                loss = train_step(model, target_model, batch, optimizer)
+                loss = replay_step(model, target_model, replay_buffer, optimizer, episode, batch_size)
 
             state = next_state
             total_reward += reward
+            steps += 1
 
         # Update the epsilon (decay epsilon for exploration)
         if epsilon > min_epsilon:
             epsilon *= epsilon_decay
 
         total_rewards.append(total_reward)
+        if first_win_episode is None and env.is_terminal() == 'game_won':
+            first_win_episode = episode
+            print(f"First win at episode {episode}")
 
         # Periodically update the target network
         if episode % target_update_freq == 0:
@@ -162,40 +308,123 @@ def dqn():
 
     return model
 
-# Testing the trained model
-def test_model():
-    env = TowerDefenseEnv()
-    obs, reward, done, info = env.reset()
+def batch_states(obs):
+    return np.column_stack((obs['current_position'], obs['current_selected_tower'])).astype(np.float32)
 
-    action_space = env.action_space.n
+# Training loop over num_envs games at once: one forward pass picks every game's action
+# and each step adds num_envs transitions to the replay buffer before one train_batch.
+# That is one gradient update per num_envs transitions where dqn() makes one per
+# transition, so the update samples batch_size * num_envs transitions to keep replaying
+# each transition as often as dqn() does.
+def dqn_batched(max_steps=None, seed=None):
+    global epsilon
+    global first_win_episode
+
+    env = BatchTowerDefenseEnv(num_envs, seed=seed)
+    rng = np.random.RandomState(seed)
+
+    action_space = env.single_action_space.n
     model = QNetwork(3, action_space)
-    model.load_state_dict(torch.load('dqn_tower_defense_model.pth'))
+    target_model = QNetwork(3, action_space)
+    target_model.load_state_dict(model.state_dict())
+    optimizer = optim.Adam(model.parameters(), lr=learning_rate)
+    replay_buffer = new_replay_buffer(seed)
+    update_size = batch_size * num_envs
+    if update_size >= max_memory:
+        raise ValueError(f"batch_size * num_envs ({update_size}) must be below max_memory ({max_memory})")
+
+    obs, _, _, _ = env.reset()
+    states = batch_states(obs)
+    episode_rewards = np.zeros(num_envs)
+    total_rewards = []
+    episode = 0
+    steps = 0
+
+    while episode < num_episodes and (max_steps is None or steps < max_steps):
+        with torch.no_grad():
+            actions = model(torch.from_numpy(states)).argmax(1).numpy()
+        explore = rng.rand(num_envs) < epsilon
+        actions[explore] = rng.randint(action_space, size=explore.sum())
+
+        next_obs, rewards, dones, info = env.step(actions)
+        next_states = batch_states(next_obs)
+        final_states = next_states
+        if dones.any():
+            final_states = next_states.copy()
+            final_states[dones] = batch_states(info['final_observation'])[dones]
+
+        replay_buffer.add_batch(states, actions, rewards, final_states, dones)
+        if replay_buffer.size() > update_size:
+            replay_step(model, target_model, replay_buffer, optimizer, episode, update_size)
+
+        states = next_states
+        episode_rewards += rewards
+        steps += num_envs
+
+        for i in np.flatnonzero(dones):
+            if episode % 100 == 0:
+                print(f"Episode {episode} - DONE")
+            total_rewards.append(episode_rewards[i])
+            episode_rewards[i] = 0
+            if first_win_episode is None and info['final_wave'][i] > env.max_waves:
+                first_win_episode = episode
+                print(f"First win at episode {episode}")
+            if epsilon > min_epsilon:
+                epsilon *= epsilon_decay
+            if episode % target_update_freq == 0:
+                target_model.load_state_dict(model.state_dict())
+            episode += 1
+
+    return model
+
+# Testing the trained model
+def distill_model(model_path='dqn_tower_defense_model.pth', table_path='dqn_policy_table.tdp'):
+    """
+    Evaluates the trained model once over every (row, col, selected_tower)
+    observation and saves its greedy actions and Q-values as a PolicyTable,
+    which GameController(algo='dqn_table') plays from without torch.
+    """
+    env = TowerDefenseEnv()
+    model = QNetwork(3, env.action_space.n)
+    model.load_state_dict(torch.load(model_path))
     model.eval()
 
-    state = np.array([obs['current_position'][0], obs['current_position'][1], obs['current_selected_tower']])
-    state = torch.tensor(state, dtype=torch.float32)
+    def q_function(observations):
+        with torch.no_grad():
+            return model(torch.from_numpy(observations)).numpy()
+
+    table = distill(q_function, env.observation_space)
+    table.save(table_path, env=env_config(env))
+    return table
+
+def test_model(table_path='dqn_policy_table.tdp'):
+    env = TowerDefenseEnv()
+    obs, reward, done, info = env.reset()
+    # The model's greedy action for every observation, looked up instead of a forward pass per step
+    table = PolicyTable.load(table_path)
     total_reward = 0
 
     while not done:
-        with torch.no_grad():
-            q_values = model(state.unsqueeze(0))
-            action = torch.argmax(q_values).item()
-        next_obs, reward, done, info = env.step(action)
-        print(f'Observation: {next_obs}, Action: {action}, Reward: {reward}, Done: {done}, Info: {info}')
-        state = np.array([next_obs['current_position'][0], next_obs['current_position'][1], next_obs['current_selected_tower']])
-        state = torch.tensor(state, dtype=torch.float32)
+        action = table.act(obs)
+        obs, reward, done, info = env.step(action)
+        print(f'Observation: {obs}, Action: {action}, Reward: {reward}, Done: {done}, Info: {info}')
         total_reward += reward
 
     print("Total reward:", total_reward)
     print("Final wave:", env.current_wave)
     env.close()
 
-is_train = False
-if is_train:
-    # Training the DQN model
-    model = dqn()
-    # Saving the trained model
-    torch.save(model.state_dict(), "dqn_tower_defense_model.pth")
-else:
-    # Test the trained model
-    test_model()
\ No newline at end of file
+if __name__ == '__main__':
+    is_train = False
+    if is_train:
+        # Training the DQN model (dqn_batched() steps num_envs games at a time)
+        model = dqn()
+        # Saving the trained model
+        torch.save(model.state_dict(), "dqn_tower_defense_model.pth")
+        write_artifact("dqn_tower_defense_model.tdp", 'qnetwork',
+                       {name: tensor.numpy() for name, tensor in model.state_dict().items()},
+                       env=env_config(TowerDefenseEnv()))
+        distill_model()
+    else:
+        # Test the trained model
+        test_model()
\ No newline at end of file
@@ -0,0 +1,208 @@
+from test_gym_train import TowerDefenseEnv
+
+# An episode log file is MAGIC followed by one record per episode:
+#
+#   varint record length (so readers can skip whole episodes)
+#   varint version, seed, checkpoint_every, state size, step count
+#   one varint per action
+#   one checkpoint per checkpoint_every steps, the first one right after reset(): the
+#   env.episode_state() entries (state size of them) followed by env.rng.flat_state(), as
+#   a varint entry count, then the entries that changed since the previous checkpoint
+#   (read as 0 past its end), as a varint count followed by (varint index gap, zigzag
+#   varint difference) pairs.
+#
+# A checkpoint holds the env's random streams whole, so loading one replays no draws however
+# far into the streams the episode started. Their two 2.5 KB Mersenne Twister keys only
+# change every 624 words, so most checkpoints store just the key indices and the unread
+# prefetched draws. The recorder never reseeds the streams itself, so an episode plays the
+# same recorded or not; seed is what env.rng was last seeded with.
+MAGIC = b'TDEL'
+VERSION = 3
+
+
+def write_varint(out, value):
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """Returns (value, position after it)."""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def unzigzag(value):
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+class EpisodeRecorder:
+    """
+    Plays episodes on env and appends each one to the log at path. Use reset(seed)
+    and step(action) in place of the env's own; an episode is written when step()
+    returns done, or by finish() / close() for an episode cut short. env.rng must
+    have been seeded with a non-negative int, by reset(seed) or earlier.
+    """
+
+    def __init__(self, env, path, checkpoint_every=32):
+        self.env = env
+        self.checkpoint_every = checkpoint_every
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self.seed = None
+
+    def reset(self, seed=None):
+        """Like env.reset(seed): seed=None carries on with the env's random streams."""
+        self.finish()
+        result = self.env.reset(seed)
+        origin = self.env.rng.origin
+        if not isinstance(origin, int) or origin < 0:
+            raise ValueError("Recording needs env.rng seeded with a non-negative int")
+        self.seed = origin
+        self.actions = bytearray()
+        self.steps = 0
+        self.checkpoints = []
+        self.checkpoint()
+        return result
+
+    def checkpoint(self):
+        state = self.env.episode_state()
+        self.state_size = len(state)
+        self.checkpoints.append(state + self.env.rng.flat_state())
+
+    def step(self, action):
+        if isinstance(action, str):
+            action = self.env.actions.index(action)
+        result = self.env.step(action)
+        write_varint(self.actions, int(action))
+        self.steps += 1
+        if self.steps % self.checkpoint_every == 0:
+            self.checkpoint()
+        if result[2]:
+            self.finish()
+        return result
+
+    def finish(self):
+        """Writes the episode in progress, if any."""
+        if self.seed is None:
+            return
+        record = bytearray()
+        for value in (VERSION, self.seed, self.checkpoint_every, self.state_size, self.steps):
+            write_varint(record, value)
+        record += self.actions
+        previous = []
+        for state in self.checkpoints:
+            previous = previous[:len(state)] + [0] * (len(state) - len(previous))
+            changed = [(i, value - old) for i, (value, old) in enumerate(zip(state, previous)) if value != old]
+            write_varint(record, len(state))
+            write_varint(record, len(changed))
+            last = 0
+            for i, diff in changed:
+                write_varint(record, i - last)
+                write_varint(record, zigzag(diff))
+                last = i
+            previous = state
+        header = bytearray()
+        write_varint(header, len(record))
+        self.file.write(header + record)
+        self.seed = None
+
+    def close(self):
+        self.finish()
+        self.file.close()
+
+
+class EpisodeReplay:
+    """
+    One recorded episode: its seed, actions and decoded checkpoints, each the
+    env.episode_state() list (state_size entries) followed by env.rng.flat_state().
+    """
+
+    def __init__(self, record):
+        pos = 0
+        fields = []
+        for _ in range(5):
+            value, pos = read_varint(record, pos)
+            fields.append(value)
+        version, self.seed, self.checkpoint_every, self.state_size, num_steps = fields
+        if version != VERSION:
+            raise ValueError(f"Unsupported episode log version {version}")
+        self.actions = []
+        for _ in range(num_steps):
+            action, pos = read_varint(record, pos)
+            self.actions.append(action)
+
+        # Decode every checkpoint up front: a checkpoint is a sum of deltas, so looking one up
+        # later is then an index, and replaying any step only costs the steps after its checkpoint.
+        self.checkpoints = []
+        previous = []
+        for _ in range(num_steps // self.checkpoint_every + 1):
+            length, pos = read_varint(record, pos)
+            count, pos = read_varint(record, pos)
+            state = previous[:length] + [0] * (length - len(previous))
+            i = 0
+            for _ in range(count):
+                gap, pos = read_varint(record, pos)
+                diff, pos = read_varint(record, pos)
+                i += gap
+                state[i] += unzigzag(diff)
+            self.checkpoints.append(state)
+            previous = state
+
+    def __len__(self):
+        return len(self.actions)
+
+    def env_at(self, step, env=None):
+        """
+        Returns env (a new TowerDefenseEnv by default) in the state it was in
+        after step steps, 0 being right after reset(), random streams included.
+        """
+        if not 0 <= step <= len(self.actions):
+            raise IndexError(f"step {step} is outside the episode's 0-{len(self.actions)}")
+        if env is None:
+            env = TowerDefenseEnv(seed=self.seed)
+        number = step // self.checkpoint_every
+        self.load_checkpoint(env, number)
+        for action in self.actions[number * self.checkpoint_every:step]:
+            env.step(action)
+        return env
+
+    def load_checkpoint(self, env, number):
+        """Puts env in the state of checkpoint number, random streams included, in constant time."""
+        checkpoint = self.checkpoints[number]
+        env.load_episode_state(checkpoint[:self.state_size])
+        env.rng.load_flat_state(checkpoint[self.state_size:])
+
+    def verify(self, env=None):
+        """Replays the whole episode from reset() and raises AssertionError at the first checkpoint it misses."""
+        env = self.env_at(0, env)
+        for step, action in enumerate(self.actions, 1):
+            env.step(action)
+            if step % self.checkpoint_every == 0:
+                number = step // self.checkpoint_every
+                if env.episode_state() + env.rng.flat_state() != self.checkpoints[number]:
+                    raise AssertionError(f"Replay diverges from the log by step {step}")
+
+
+def read_episodes(path):
+    """Yields every episode in the log at path as an EpisodeReplay."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not an episode log")
+    pos = len(MAGIC)
+    while pos < len(data):
+        length, pos = read_varint(data, pos)
+        yield EpisodeReplay(data[pos:pos + length])
+        pos += length
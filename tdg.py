@@ -1,7 +1,11 @@
+import os
 import pygame
 import sys
 import random
-import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Q-learning', 'UI'))
+import text_cache
+from fixed_timestep import FixedTimestep
 
 width, height = 800, 450
 cell_size = 32
@@ -21,6 +25,14 @@ game_started = False
 coins = 100
 MAX_TOWERS = 5
 
+# Enemies advance on a simulated clock that moves in fixed 100 ms steps, sim_speed (1-1000,
+# first command line argument) times faster than real time, independently of the frame rate.
+sim_speed = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+timestep = FixedTimestep(100, sim_speed)
+
+def sim_seconds():
+    return timestep.sim_time / 1000
+
 pygame.init()
 screen = pygame.display.set_mode((width, height))
 pygame.display.set_caption('Tower Defense')
@@ -45,8 +57,6 @@ enemy_info = {
 }
 
 def draw_grid():
-    font = pygame.font.SysFont(None, 24)
-
     for row in range(rows):
         for col in range(cols):
             if (col, row) in towers:
@@ -55,7 +65,7 @@ def draw_grid():
                 tower_health = towers[(col, row)]['health']
 
                 pygame.draw.rect(screen, tower_color, (col * cell_size, row * cell_size, cell_size, cell_size))
-                text = font.render(str(tower_health), True, BLACK)
+                text = text_cache.render(str(tower_health), 24, BLACK)
                 screen.blit(text, (col * cell_size + cell_size // 3, row * cell_size + cell_size // 4))
             else:
                 color = GREY if row == path_row else GREEN
@@ -69,29 +79,27 @@ def draw_grid():
         # enemy_health = enemy_info[enemy_type]['health'] if enemy_type is not None else 1
         enemy_health = enemy['health']
 
-        text = font.render(str(enemy_health), True, WHITE)
+        text = text_cache.render(str(enemy_health), 24, WHITE)
         screen.blit(text, (enemy['x'] * cell_size + cell_size // 3, path_row * cell_size + cell_size // 4))
 
     pygame.draw.rect(screen, WHITE, (player_pos[0] * cell_size, player_pos[1] * cell_size, cell_size, cell_size), 3)
 
 def draw_ui():
-    font = pygame.font.SysFont(None, 36)
-
-    screen.blit(font.render(f'Selected Tower: {selected_tower if selected_tower else "None"}', True, BLACK), (10, rows*cell_size+10))
-    screen.blit(font.render(f'Wave: {wave_number}', True, BLACK), (300, rows*cell_size+10))
-    screen.blit(font.render(f'Coins: {coins}', True, BLACK), (425, rows * cell_size + 10))
+    screen.blit(text_cache.render(f'Selected Tower: {selected_tower if selected_tower else "None"}', 36, BLACK), (10, rows*cell_size+10))
+    screen.blit(text_cache.render(f'Wave: {wave_number}', 36, BLACK), (300, rows*cell_size+10))
+    screen.blit(text_cache.render(f'Coins: {coins}', 36, BLACK), (425, rows * cell_size + 10))
 
     if game_started:
-        screen.blit(font.render(f'Time: {int(time.time()-start_time)}', True, BLACK), (650, rows*cell_size+10))
+        screen.blit(text_cache.render(f'Time: {int(sim_seconds()-start_time)}', 36, BLACK), (650, rows*cell_size+10))
 
     available_towers = [str(i) for i in range(1, 7) if i <= wave_number]
     locked_towers = [str(i) for i in range(1, 7) if i > wave_number]
-    avail_text = font.render(f'Available Towers: {",".join(available_towers)}', True, BLACK)
+    avail_text = text_cache.render(f'Available Towers: {",".join(available_towers)}', 36, BLACK)
     screen.blit(avail_text, (10, rows * cell_size + 50))
-    locked_text = font.render(f'Locked Towers: {",".join(locked_towers)}', True, BLACK)
+    locked_text = text_cache.render(f'Locked Towers: {",".join(locked_towers)}', 36, BLACK)
     screen.blit(locked_text, (10, rows * cell_size + 80))
 
-    towers_count = font.render(f'Towers placed: {len(towers)}', True, BLACK)
+    towers_count = text_cache.render(f'Towers placed: {len(towers)}', 36, BLACK)
     screen.blit(towers_count, (400, rows * cell_size + 50))
 
 def handle_input(event):
@@ -124,7 +132,7 @@ def handle_input(event):
         elif event.key == pygame.K_v:
             allow_tower_placement = False
             game_started = True
-            start_time = time.time()
+            start_time = sim_seconds()
 
 last_move_time = 0  # Track last movement update
 
@@ -135,7 +143,7 @@ def update_enemies():
     global coins
     if start_time is None:
         return
-    current_time = int(time.time() - start_time)
+    current_time = int(sim_seconds() - start_time)
 
     # Spawn enemies once per second
     if enemy_count < max_enemies and current_time >= enemy_count:
@@ -174,65 +182,86 @@ def update_enemies():
         game_started = False
         start_time = None
 
+def build_tower_columns(x_values):
+    """For every tower type and (x, y) cell, the enemy columns in x_values inside the tower's range."""
+    return {
+        tower_type: {(tower_x, tower_y): tuple(x for x in x_values
+                                               if abs(tower_x - x) + abs(tower_y - path_row) <= info['range'])
+                     for tower_x in range(cols) for tower_y in range(rows)}
+        for tower_type, info in tower_info.items()
+    }
+
+# Enemies spawn at x == cols, one column past the right edge of the grid.
+tower_columns = build_tower_columns(range(cols + 1))
+enemy_targets = {}
+
+def get_enemy_targets(enemy_type, enemy_x):
+    """Cells an enemy of enemy_type standing at enemy_x can counterattack."""
+    key = (enemy_type, enemy_x)
+    if key not in enemy_targets:
+        enemy_range = enemy_info[enemy_type]['range']
+        enemy_targets[key] = tuple((tower_x, tower_y) for tower_x in range(cols) for tower_y in range(rows)
+                                   if abs(tower_x - enemy_x) + abs(tower_y - path_row) <= enemy_range)
+    return enemy_targets[key]
+
 def resolve_combat():
     global enemies, towers
 
-    enemies_to_remove = []
-    towers_to_remove = []
-
-    for (tower_x, tower_y), info in towers.items():
-        tower_type = info['type']
-        tower_range = tower_info[tower_type]['range']
-        tower_damage = tower_info[tower_type]['damage']
-        tower_health = tower_info[tower_type]['health']
-
-        for enemy in enemies:
-            enemy_x, enemy_y = enemy['x'], path_row
-
-            enemy_type = enemy['type']
-
-            # Calculate Manhattan distance
-            distance = abs(tower_x - enemy_x) + abs(tower_y - enemy_y)
+    if not enemies:
+        return
 
-            # Tower attacks enemy
-            if distance <= tower_range:
-                enemy['health'] -= tower_damage  # Enemy takes damage
-                if enemy['health'] <= 0:
-                    enemies_to_remove.append(enemy)  # Mark enemy for removal
+    # Damage landing on each enemy column this round.
+    column_damage = {}
+    for pos, info in towers.items():
+        tower_damage = tower_info[info['type']]['damage']
+        for x in tower_columns[info['type']][pos]:
+            column_damage[x] = column_damage.get(x, 0) + tower_damage
 
-            # Enemy attacks tower
-            if distance <= enemy_info[enemy_type]['range']:
-                info['health'] -= enemy_info[enemy_type]['damage']  # Tower takes damage
-                if info['health'] <= 0:
-                    towers_to_remove.append((tower_x, tower_y))  # Mark tower for removal
+    towers_hit = []
+    for enemy in enemies:
+        enemy_x, enemy_type = enemy['x'], enemy['type']
+
+        # Tower attacks enemy
+        if 0 <= enemy_x <= cols:
+            enemy['health'] -= column_damage.get(enemy_x, 0)
+        else:
+            for (tower_x, tower_y), info in towers.items():
+                if abs(tower_x - enemy_x) + abs(tower_y - path_row) <= tower_info[info['type']]['range']:
+                    enemy['health'] -= tower_info[info['type']]['damage']
+
+        # Enemy attacks tower
+        for pos in get_enemy_targets(enemy_type, enemy_x):
+            if pos in towers:
+                towers[pos]['health'] -= enemy_info[enemy_type]['damage']
+                towers_hit.append(pos)
 
     # Remove dead enemies
-    enemies = [enemy for enemy in enemies if enemy not in enemies_to_remove]
+    enemies = [enemy for enemy in enemies if enemy['health'] > 0]
 
     # Remove destroyed towers
-    for tower in towers_to_remove:
-        if tower in towers:
+    for tower in towers_hit:
+        if tower in towers and towers[tower]['health'] <= 0:
             del towers[tower]
 
 def draw_game_over():
     if game_over:
-        font = pygame.font.SysFont(None, 72)
-        text = font.render("GAME OVER", True, (255, 0, 0))
+        text = text_cache.render("GAME OVER", 72, (255, 0, 0))
         text_rect = text.get_rect(center=(width // 2, height // 2))
         screen.blit(text, text_rect)
 
 clock = pygame.time.Clock()
 while running:
-    screen.fill(WHITE)
-    draw_grid()
-    draw_ui()
-    if game_started:
-        update_enemies()
-    draw_game_over()
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
         handle_input(event)
+    for _ in timestep.steps(clock.get_time()):
+        if game_started:
+            update_enemies()
+    screen.fill(WHITE)
+    draw_grid()
+    draw_ui()
+    draw_game_over()
     pygame.display.flip()
     clock.tick(10)
 